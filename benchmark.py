@@ -0,0 +1,6 @@
+import sys
+
+from src.benchmark import Benchmark
+
+if __name__ == "__main__":
+    Benchmark().run(sys.argv[1:])
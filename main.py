@@ -1,4 +1,89 @@
+import argparse
+from pathlib import Path
+
+from src.helper.profiler import Profiler
+from src.helper.shards import Shards
 from src.process import Process
 
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Convert the raw election data into the ready data."
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        help="directory for the cache of parsed raw files (default: .cache/members)",
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=int,
+        default=Process.default_cache_max_bytes // 1024 // 1024,
+        help="maximum size of the cache in megabytes (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="always parse the raw files and build every election",
+    )
+    profile = parser.add_mutually_exclusive_group()
+    profile.add_argument(
+        "--profile",
+        action="store_true",
+        help="profile each parser and format populate with cProfile, "
+        "writing a .pstats file for each election and stage to .cache/profile",
+    )
+    profile.add_argument(
+        "--profile-sample-ms",
+        type=float,
+        metavar="MS",
+        help="instead sample the stack every MS milliseconds, "
+        "writing a .folded file for each election and stage to .cache/profile",
+    )
+    parser.add_argument(
+        "--profile-top",
+        type=int,
+        default=Profiler.default_top,
+        help="number of functions to log for each profiled stage "
+        "(default: %(default)s)",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of processes used to build the elections (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--shard",
+        type=Shards.parse,
+        metavar="i/N",
+        help="only build shard i of N shards of the elections, "
+        "balanced by the size of the raw files, "
+        "and write them to a shard file instead of the ready files",
+    )
+    parser.add_argument(
+        "--shard-output",
+        type=Path,
+        help="the shard file to write (default: .cache/shards/shard-i-of-N.json)",
+    )
+    Process.add_output_arguments(parser)
+    args = parser.parse_args()
+
+    Process(
+        cache_dir=args.cache_dir,
+        cache_max_bytes=args.cache_max_mb * 1024 * 1024,
+        use_cache=not args.no_cache,
+        jobs=args.jobs,
+        shard=args.shard,
+        shard_path=args.shard_output,
+        profile=args.profile,
+        profile_sample=(
+            args.profile_sample_ms / 1000 if args.profile_sample_ms else None
+        ),
+        profile_top=args.profile_top,
+        **Process.output_options(args),
+    ).run()
+
+
 if __name__ == "__main__":
-    Process().run()
+    main()
@@ -0,0 +1,24 @@
+import argparse
+from pathlib import Path
+
+from src.process import Process
+
+
+def merge():
+    parser = argparse.ArgumentParser(
+        description="Combine the shard files from every shard into the ready data."
+    )
+    parser.add_argument(
+        "paths",
+        type=Path,
+        nargs="+",
+        help="the shard files written by 'main.py --shard i/N'",
+    )
+    Process.add_output_arguments(parser)
+    args = parser.parse_args()
+
+    Process(use_cache=False, **Process.output_options(args)).merge_shards(args.paths)
+
+
+if __name__ == "__main__":
+    merge()
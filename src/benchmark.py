@@ -0,0 +1,1031 @@
+import gzip
+import importlib.resources
+import io
+import multiprocessing
+import resource
+import tempfile
+import time
+import tracemalloc
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable
+from xml.etree import ElementTree
+from xml.etree.ElementTree import Element
+
+from boltons.strutils import slugify
+
+from src.helper.codes import Codes
+from src.helper.compact_json import CompactJson
+from src.helper.election_artifacts import ElectionArtifacts
+from src.helper.general import General
+from src.helper.model_json import ModelJson
+from src.helper.profiler import Profiler
+from src.helper.report import Report
+from src.helper.shards import Shards
+from src.helper.table import Table
+from src.helper.xml_node import XmlNode
+from src.helper.xml_stream import XmlStream
+from src.model.combination import Combination
+from src.model.note import Note
+from src.model.result import Result
+from src.process import Process
+from src.ready_bundles import ReadyBundles
+from src.ready_store import ReadyStore
+from src.store import Store
+
+
+class Benchmark:
+    """Measure the time and memory used by parts of the data processing."""
+
+    def __init__(self):
+        self._general = General()
+        self.store = Store(self._general)
+
+        with importlib.resources.files("raw") as p:
+            self.raw_path = Path(p)
+
+        self.federal_2019_path = self.raw_path / "2019-05-18-au" / "original.zip"
+        self.federal_2019_feed = "aec-mediafeed-results-standard-verbose-24310.xml"
+        self.feed_namespaces = {
+            "mf": "http://www.aec.gov.au/xml/schema/mediafeed",
+            "eml": "urn:oasis:names:tc:evs:schema:eml",
+        }
+        self.feed_contest_path = "mf:Results/mf:Election/*/mf:Contests/mf:Contest"
+
+    def run(self, names: list[str]) -> None:
+        """Run the named benchmarks, or all of them if no names are given."""
+        available = self.available()
+        for name in names or list(available.keys()):
+            if name not in available:
+                raise ValueError(f"Unknown benchmark '{name}'.")
+            self._general.log.info(f"Running benchmark '{name}'.")
+            available[name]()
+
+    def available(self) -> dict[str, Callable[[], None]]:
+        """Get the benchmarks that can be run."""
+        return {
+            "zip-read": self.zip_read,
+            "table-memory": self.table_memory,
+            "xml-stream": self.xml_stream,
+            "xml-node": self.xml_node,
+            "combination-add": self.combination_add,
+            "combination-merge": self.combination_merge,
+            "note-normalise": self.note_normalise,
+            "codes": self.codes,
+            "combination-partition": self.combination_partition,
+            "json-write": self.json_write,
+            "json-fan-out": self.json_fan_out,
+            "compact-format": self.compact_format,
+            "ndjson-read": self.ndjson_read,
+            "ready-lookup": self.ready_lookup,
+            "ready-bundles": self.ready_bundles,
+            "parallel-build": self.parallel_build,
+            "incremental-build": self.incremental_build,
+            "shard-balance": self.shard_balance,
+            "report-overhead": self.report_overhead,
+            "profile-overhead": self.profile_overhead,
+        }
+
+    def zip_read(self) -> None:
+        """Compare reading an original zip file member by member
+        with reading it in one pass using streams."""
+        path = self.federal_2019_path
+        cases = {
+            "reopen and read text": self._zip_read_text,
+            "open once and stream": self._zip_read_stream,
+        }
+        self.show_measures(
+            "zip-read", {k: self.measure_isolated(v, path) for k, v in cases.items()}
+        )
+
+    def _zip_read_text(self, path: Path) -> int:
+        """Read a zip file by reading each file as text, reopening the zip file
+        each time."""
+        count = 0
+        for filename in self.store.get_zip_file_list(path):
+            if filename.endswith(".csv"):
+                content = self.store.read_text_zip_file(path, filename)
+                count += len(self.store.read_csv_content(content))
+            elif filename.endswith(".xml"):
+                content = self.store.read_text_zip_file(path, filename)
+                count += len(self.store.read_xml_content(content)["children"])
+        return count
+
+    def _zip_read_stream(self, path: Path) -> int:
+        """Read a zip file by opening it once and streaming each file."""
+        count = 0
+        with zipfile.ZipFile(path, "r") as f:
+            for info in self.store.get_zip_info_list(f):
+                if info.filename.endswith(".csv"):
+                    count += len(self.store.read_zip_member(f, info))
+                elif info.filename.endswith(".xml"):
+                    stream = self.store.read_zip_member(f, info)
+                    count += sum(1 for _ in stream.select("*"))
+        return count
+
+    def table_memory(self) -> None:
+        """Compare the memory used by the large csv files
+        as a list of dicts and as a Table."""
+        path = self.federal_2019_path
+        filenames = [
+            "HouseDopByDivisionDownload-24310.csv",
+            "SenateStateDOPDownload-24310-NSW.csv",
+        ]
+        log = self._general.log
+        log.info("table-memory:")
+        log.info(
+            f"  {'file':<40} {'rows':>7} {'dicts MB':>9} {'table MB':>9} "
+            f"{'dicts s':>8} {'table s':>8}"
+        )
+        for filename in filenames:
+            rows, rows_bytes, rows_seconds = self._measure_memory(
+                lambda: list(self.store.iter_zip_rows(path, filename))
+            )
+            table, table_bytes, table_seconds = self._measure_memory(
+                lambda: Table.from_rows(list(rows[0].keys()), rows)
+            )
+            if table.to_rows() != rows:
+                raise ValueError(f"Table rows do not match for '{filename}'.")
+
+            log.info(
+                f"  {filename:<40} {len(rows):>7} "
+                f"{rows_bytes / 1024 / 1024:>9.1f} {table_bytes / 1024 / 1024:>9.1f} "
+                f"{rows_seconds:>8.3f} {table_seconds:>8.3f}"
+            )
+
+        # compare filtering and grouping
+        rows = list(self.store.iter_zip_rows(path, filenames[0]))
+        table = Table.from_rows(list(rows[0].keys()), rows)
+        calc = "Preference Count"
+        start = time.perf_counter()
+        rows_total = {}
+        for row in rows:
+            if row["CalculationType"] == calc:
+                state = row["StateAb"]
+                value = int(row["CalculationValue"])
+                rows_total[state] = rows_total.get(state, 0) + value
+        rows_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        table_total = {
+            k: v.sum("CalculationValue")
+            for k, v in table.where("CalculationType", calc).group_by("StateAb").items()
+        }
+        table_seconds = time.perf_counter() - start
+        if rows_total != table_total:
+            raise ValueError("Table totals do not match.")
+        log.info(
+            f"  filter and group by state: dicts {rows_seconds:.3f}s, "
+            f"table {table_seconds:.3f}s"
+        )
+
+    def xml_stream(self) -> None:
+        """Compare the peak memory used to read the contests from the media feed
+        by building the whole tree and by streaming the contests.
+        Also stream a large feed made by repeating the contests."""
+        path = self.federal_2019_path
+        feed = self.federal_2019_feed
+        stream = XmlStream.from_zip(path, feed)
+        log = self._general.log
+        log.info("xml-stream:")
+        log.info(f"  {'case':<40} {'contests':>9} {'peak MB':>9} {'seconds':>8}")
+
+        def whole_tree() -> int:
+            content = self.store.read_text_zip_file(path, feed)
+            tree = self.store.read_xml_content(content)
+            return sum(
+                len(contests["children"])
+                for election in tree["children"][4]["children"][1:]
+                for contests in election["children"][1]["children"][:1]
+            )
+
+        def streamed(source: XmlStream) -> int:
+            return sum(
+                1
+                for _ in source.select(
+                    self.feed_contest_path, namespaces=self.feed_namespaces
+                )
+            )
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            repeats = 15
+            large_path = Path(temp_dir) / "large-feed.xml"
+            large_size = self._write_large_feed(large_path, repeats)
+            large_title = f"stream {large_size / 1024 / 1024:.0f} MB feed"
+
+            cases = {
+                "whole tree as dicts": whole_tree,
+                "stream contests": lambda: streamed(stream),
+                large_title: lambda: streamed(XmlStream.from_file(large_path)),
+            }
+            for name, func in cases.items():
+                count, peak, seconds = self._measure_peak_memory(func)
+                log.info(
+                    f"  {name:<40} {count:>9} {peak / 1024 / 1024:>9.1f} {seconds:>8.3f}"
+                )
+
+    def xml_node(self) -> None:
+        """Compare the memory used by the media feed as nested dicts
+        and as compact nodes, and the time to look up children by tag."""
+        with zipfile.ZipFile(self.federal_2019_path, "r") as z:
+            root = ElementTree.fromstring(z.read(self.federal_2019_feed))
+        log = self._general.log
+        log.info("xml-node:")
+
+        dicts, dicts_bytes, dicts_seconds = self._measure_memory(
+            lambda: _element_to_dict(root)
+        )
+        nodes, nodes_bytes, nodes_seconds = self._measure_memory(
+            lambda: XmlNode.from_element(root)
+        )
+        log.info(f"  {'case':<32} {'MB':>9} {'seconds':>8}")
+        log.info(
+            f"  {'nested dicts':<32} {dicts_bytes / 1024 / 1024:>9.1f} "
+            f"{dicts_seconds:>8.3f}"
+        )
+        log.info(
+            f"  {'compact nodes':<32} {nodes_bytes / 1024 / 1024:>9.1f} "
+            f"{nodes_seconds:>8.3f}"
+        )
+
+        # find the enrolment of every contest
+        ns = self.feed_namespaces
+        contest_tag = f"{{{ns['mf']}}}Contest"
+        enrolment_tag = f"{{{ns['mf']}}}Enrolment"
+
+        def scan(item: dict) -> list[str]:
+            result = []
+            for child in item["children"]:
+                if child["tag"] == contest_tag:
+                    result.extend(
+                        i["text"]
+                        for i in child["children"]
+                        if i["tag"] == enrolment_tag
+                    )
+                else:
+                    result.extend(scan(child))
+            return result
+
+        def find(node: XmlNode) -> list[str]:
+            return [
+                contest.findtext("mf:Enrolment", None, ns)
+                for election in node.findall("mf:Results/mf:Election", ns)
+                for group in election.children
+                for contest in group.findall("mf:Contests/mf:Contest", ns)
+            ]
+
+        for name, func, tree in [
+            ("linear scan of dicts", scan, dicts),
+            ("indexed find on nodes", find, nodes),
+        ]:
+            start = time.perf_counter()
+            for _ in range(10):
+                found = func(tree)
+            seconds = time.perf_counter() - start
+            log.info(f"  {name:<32} {len(found):>9} {seconds:>8.3f}")
+
+    def combination_add(self) -> None:
+        """Compare adding results to a Combination that scans a plain list
+        with adding them to the indexed collections,
+        from a thousand to a million results."""
+        log = self._general.log
+        log.info("combination-add:")
+        log.info(f"  {'results':>9} {'list s':>9} {'indexed s':>9} {'normalise s':>11}")
+
+        # scanning a list takes too long for the larger sizes
+        max_scan = 10**4
+        for size in [10**3, 10**4, 10**5, 10**6]:
+            # every tenth result is a duplicate that is merged in
+            items = [_synthetic_result(i % (size - size // 10)) for i in range(size)]
+
+            if size <= max_scan:
+                scanned = Combination.build_empty()
+                scanned.results = list(scanned.results)
+                start = time.perf_counter()
+                for item in items:
+                    scanned.add(item)
+                scan_text = f"{time.perf_counter() - start:>9.3f}"
+            else:
+                scan_text = f"{'-':>9}"
+
+            items = [_synthetic_result(i % (size - size // 10)) for i in range(size)]
+            indexed = Combination.build_empty()
+            start = time.perf_counter()
+            for item in items:
+                indexed.add(item)
+            indexed_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            Result.normalise(list(reversed(indexed.results)))
+            normalise_seconds = time.perf_counter() - start
+
+            log.info(
+                f"  {size:>9} {scan_text} {indexed_seconds:>9.3f} "
+                f"{normalise_seconds:>11.3f}"
+            )
+
+    def combination_merge(self) -> None:
+        """Compare merging elections into a Combination by normalising
+        all the results each time with merging only the new results."""
+        log = self._general.log
+        log.info("combination-merge:")
+        log.info(
+            f"  {'elections':>9} {'results':>9} {'normalise s':>11} {'merge s':>9}"
+        )
+
+        elections = 15
+        size = 20000
+
+        def build(election: int) -> Combination:
+            combination = Combination.build_empty()
+            # each election shares a tenth of its results with the previous one
+            first = election * (size - size // 10)
+            for number in range(first, first + size):
+                combination.add(_synthetic_result(number))
+            return combination
+
+        normalised = []
+        normalise_seconds = 0.0
+        merged = Combination.build_empty()
+        merge_seconds = 0.0
+        for election in range(elections):
+            other = build(election)
+            start = time.perf_counter()
+            normalised = Result.normalise(normalised + list(other.results))
+            normalise_seconds += time.perf_counter() - start
+
+            other = build(election)
+            start = time.perf_counter()
+            merged.merge_in(other)
+            merge_seconds += time.perf_counter() - start
+
+            log.info(
+                f"  {election + 1:>9} {len(merged.results):>9} "
+                f"{normalise_seconds:>11.3f} {merge_seconds:>9.3f}"
+            )
+
+        if [i.code for i in normalised] != [i.code for i in merged.results]:
+            raise ValueError("Merged results do not match.")
+
+    def note_normalise(self) -> None:
+        """Compare normalising the notes of the 2019 candidates by scanning
+        and slugifying each time with the cached sort key and hash identity.
+        Each candidate's notes are merged with copies, as when the candidate
+        is found in more than one file."""
+        path = self.raw_path.parent / "ready" / "2019-05-18-au.json"
+        candidates = self.store.read_json_file(path)["candidates"]
+        note_lists = [
+            [Note.from_dict(n) for n in candidate["notes"]] for candidate in candidates
+        ]
+        log = self._general.log
+        log.info("note-normalise:")
+        log.info(f"  {'case':<32} {'notes':>9} {'seconds':>8}")
+
+        merges = 5
+        cases = {
+            "scan and slugify": _normalise_notes_by_scan,
+            "cached key and identity": Note.normalise,
+        }
+        results = {}
+        for name, func in cases.items():
+            notes = [[Note.from_dict(n.to_dict()) for n in i] for i in note_lists]
+            seconds = 0.0
+            for _ in range(merges):
+                copies = [[n.copy() for n in i] for i in note_lists]
+                start = time.perf_counter()
+                notes = [func(a + b) for a, b in zip(notes, copies)]
+                seconds += time.perf_counter() - start
+            results[name] = notes
+            count = sum(len(i) for i in results[name])
+            log.info(f"  {name:<32} {count:>9} {seconds:>8.3f}")
+
+        expected, actual = results.values()
+        if [[n.identity for n in i] for i in expected] != [
+            [n.identity for n in i] for i in actual
+        ]:
+            raise ValueError("Normalised notes do not match.")
+
+    def codes(self) -> None:
+        """Compare building the codes for the 2019 candidates
+        with and without remembering the slugs."""
+        rows = list(
+            self.store.iter_zip_rows(
+                self.federal_2019_path, "HouseCandidatesDownload-24310.csv"
+            )
+        )
+        log = self._general.log
+        log.info("codes:")
+        log.info(f"  {'case':<32} {'codes':>9} {'seconds':>8}")
+
+        def build(general: General) -> list[str]:
+            result = []
+            for _ in range(10):
+                for row in rows:
+                    title = general.electorate_title(row["DivisionNm"])
+                    party = general.party_title(row["PartyNm"]) or "independent"
+                    result.extend(
+                        [
+                            general.electorate_code("house", title),
+                            general.ballot_code("house", title),
+                            general.party_code("election", party),
+                            general.candidate_code(
+                                "house", title, row["GivenNm"], row["Surname"]
+                            ),
+                            general.result_electorate_code("house", title, "enrolment"),
+                        ]
+                    )
+            return result
+
+        results = {}
+        cases = [("not remembered", 0), ("remembered", Codes.default_max_size)]
+        for name, max_size in cases:
+            general = General(max_size)
+            start = time.perf_counter()
+            results[name] = build(general)
+            seconds = time.perf_counter() - start
+            log.info(f"  {name:<32} {len(results[name]):>9} {seconds:>8.3f}")
+            log.info(f"  {general.codes.summary()}")
+
+        expected, actual = results.values()
+        if expected != actual:
+            raise ValueError("Codes do not match.")
+
+    def combination_partition(self) -> None:
+        """Compare splitting the results into elections by scanning
+        the results for each election with grouping them in one pass."""
+        log = self._general.log
+        log.info("combination-partition:")
+        log.info(f"  {'elections':>9} {'results':>9} {'scan s':>9} {'group s':>9}")
+
+        size = 200000
+        for elections in [1, 5, 20, 80]:
+            combination = Combination.build_empty()
+            for number in range(size):
+                item = _synthetic_result(number)
+                item.election_code = f"election-{number % elections}"
+                combination.add(item)
+            codes = sorted({i.election_code for i in combination.results})
+
+            start = time.perf_counter()
+            scanned = {
+                code: [i for i in combination.results if i.election_code == code]
+                for code in codes
+            }
+            scan_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            partitions = combination.partition_by("election_code")
+            group_seconds = time.perf_counter() - start
+
+            if scanned != {k: list(v.results) for k, v in partitions.items()}:
+                raise ValueError("Partitioned results do not match.")
+            log.info(
+                f"  {elections:>9} {size:>9} {scan_seconds:>9.3f} {group_seconds:>9.3f}"
+            )
+
+    def json_write(self) -> None:
+        """Compare writing the ready files with the dataclasses_json schema
+        and with the model json writer.
+        Both must give exactly the same text as the ready files."""
+        log = self._general.log
+        log.info("json-write:")
+        log.info(
+            f"  {'file':<30} {'MB':>6} {'schema s':>9} {'writer s':>9} "
+            f"{'schema MB/s':>11} {'writer MB/s':>11}"
+        )
+        model_json = ModelJson()
+        # only the ready files, not the manifest or the other formats
+        ready_path = self.raw_path.parent / "ready"
+        all_combination = Combination.schema().loads(
+            (ready_path / "all.json").read_text(encoding="utf-8")
+        )
+        names = [
+            "all",
+            *Combination.collection_names,
+            *(i.code for i in all_combination.elections),
+        ]
+        paths = (ready_path / f"{name}.json" for name in names)
+        for path in sorted(i for i in paths if i.exists()):
+            expected = path.read_text(encoding="utf-8")
+            combination = Combination.schema().loads(expected)
+
+            start = time.perf_counter()
+            schema_text = Combination.schema().dumps(combination, sort_keys=True)
+            schema_seconds = time.perf_counter() - start
+
+            buffer = io.StringIO()
+            start = time.perf_counter()
+            model_json.dump(combination, buffer)
+            writer_seconds = time.perf_counter() - start
+
+            if schema_text != expected or buffer.getvalue() != expected:
+                raise ValueError(f"Json text does not match '{path.name}'.")
+
+            size = len(expected.encode("utf-8")) / 1024 / 1024
+            log.info(
+                f"  {path.name:<30} {size:>6.2f} {schema_seconds:>9.3f} "
+                f"{writer_seconds:>9.3f} {size / schema_seconds:>11.1f} "
+                f"{size / writer_seconds:>11.1f}"
+            )
+
+    def json_fan_out(self) -> None:
+        """Compare the peak memory and time used to write all the ready files
+        as one string per file, with one writer per file,
+        and with one pass that writes each item to all its files."""
+        combination = Combination.schema().loads(
+            (self.raw_path.parent / "ready" / "all.json").read_text(encoding="utf-8")
+        )
+        model_json = ModelJson()
+        election_codes = {i.code for i in combination.elections}
+
+        def separate_objects() -> dict[str, Combination]:
+            result = {"all": combination}
+            partitions = combination.partition_by("election_code")
+            result.update({k: partitions[k] for k in election_codes})
+            for name in Combination.collection_names:
+                result[name] = Combination(
+                    **{
+                        k: getattr(combination, k) if k == name else []
+                        for k in Combination.collection_names
+                    }
+                )
+            return result
+
+        def schema_strings(directory: Path) -> int:
+            for key, obj in separate_objects().items():
+                text = Combination.schema().dumps(obj, sort_keys=True)
+                (directory / f"{key}.json").write_text(text, encoding="utf-8")
+            return len(list(directory.iterdir()))
+
+        def writer_per_file(directory: Path) -> int:
+            for key, obj in separate_objects().items():
+                with open(directory / f"{key}.json", "wt", encoding="utf-8") as f:
+                    model_json.dump(obj, f)
+            return len(list(directory.iterdir()))
+
+        def fan_out(directory: Path) -> int:
+            keys = ["all", *election_codes, *Combination.collection_names]
+
+            def route(name: str, item) -> list[str]:
+                code = Combination.partition_key("election_code", name, item)
+                return ["all", code, name] if code in election_codes else ["all", name]
+
+            files = {
+                k: open(directory / f"{k}.json", "wt", encoding="utf-8") for k in keys
+            }
+            try:
+                model_json.dump_fan_out(combination, files, route)
+            finally:
+                for f in files.values():
+                    f.close()
+            return len(files)
+
+        log = self._general.log
+        log.info("json-fan-out:")
+        log.info(f"  {'case':<32} {'files':>6} {'peak MB':>9} {'seconds':>8}")
+        cases = {
+            "schema string per file": schema_strings,
+            "writer per file": writer_per_file,
+            "one pass to all files": fan_out,
+        }
+        with tempfile.TemporaryDirectory() as temp_dir:
+            outputs = {}
+            for name, func in cases.items():
+                directory = Path(temp_dir) / str(len(outputs))
+                directory.mkdir()
+                count, peak, seconds = self._measure_peak_memory(
+                    lambda: func(directory)
+                )
+                outputs[name] = {i.name: i.read_bytes() for i in directory.iterdir()}
+                log.info(
+                    f"  {name:<32} {count:>6} {peak / 1024 / 1024:>9.1f} {seconds:>8.3f}"
+                )
+
+        first, *others = outputs.values()
+        if any(i != first for i in others):
+            raise ValueError("Written files do not match.")
+
+    def compact_format(self) -> None:
+        """Compare the size and decode time of the ready json files
+        with the compact format, and check the compact format
+        gives back the same json."""
+        compact_json = CompactJson(Combination)
+        model_json = ModelJson()
+        log = self._general.log
+        log.info("compact-format:")
+        log.info(
+            f"  {'file':<20} {'format':<8} {'KB':>8} {'gzip KB':>8} {'decode s':>9}"
+        )
+        for name in ["2019-05-18-au.json", "all.json"]:
+            text = (self.raw_path.parent / "ready" / name).read_text(encoding="utf-8")
+
+            start = time.perf_counter()
+            combination = Combination.schema().loads(text)
+            json_seconds = time.perf_counter() - start
+
+            compact_text = compact_json.dumps(combination)
+            start = time.perf_counter()
+            decoded = compact_json.loads(compact_text)
+            compact_seconds = time.perf_counter() - start
+
+            buffer = io.StringIO()
+            model_json.dump(decoded, buffer)
+            if buffer.getvalue() != text:
+                raise ValueError(f"Compact format does not give back '{name}'.")
+
+            for label, content, seconds in [
+                ("json", text, json_seconds),
+                ("compact", compact_text, compact_seconds),
+            ]:
+                data = content.encode("utf-8")
+                log.info(
+                    f"  {name:<20} {label:<8} {len(data) / 1024:>8.0f} "
+                    f"{len(gzip.compress(data)) / 1024:>8.0f} {seconds:>9.3f}"
+                )
+
+    def ndjson_read(self) -> None:
+        """Compare the peak memory and time used to count the candidates
+        of the 2019 federal election by loading the json file
+        and by reading the newline-delimited json one line at a time."""
+        json_path = self.raw_path.parent / "ready" / "2019-05-18-au.json"
+        combination = Combination.schema().loads(json_path.read_text(encoding="utf-8"))
+        model_json = ModelJson()
+
+        def load_json() -> int:
+            loaded = Combination.schema().loads(json_path.read_text(encoding="utf-8"))
+            return len(loaded.candidates)
+
+        def read_lines(path: Path) -> int:
+            return sum(
+                1 for _ in model_json.iter_lines(path, Combination, ["candidates"])
+            )
+
+        log = self._general.log
+        log.info("ndjson-read:")
+        log.info(f"  {'case':<32} {'items':>6} {'peak MB':>9} {'seconds':>8}")
+        with tempfile.TemporaryDirectory() as temp_dir:
+            lines_path = Path(temp_dir) / "2019-05-18-au.ndjson"
+            with open(lines_path, "wt", encoding="utf-8") as f:
+                model_json.dump_lines_fan_out(
+                    combination, {"lines": f}, lambda name, item: ["lines"]
+                )
+
+            cases = {
+                "load json file": load_json,
+                "read ndjson lines": lambda: read_lines(lines_path),
+            }
+            for name, func in cases.items():
+                count, peak, seconds = self._measure_peak_memory(func)
+                log.info(
+                    f"  {name:<32} {count:>6} {peak / 1024 / 1024:>9.1f} {seconds:>8.3f}"
+                )
+
+    def ready_lookup(self) -> None:
+        """Compare the peak memory and time used to get one candidate
+        of the 2019 federal election by loading the json file
+        and by using the offset index."""
+        json_path = self.raw_path.parent / "ready" / "2019-05-18-au.json"
+        combination = Combination.schema().loads(json_path.read_text(encoding="utf-8"))
+        codes = [i.code for i in combination.candidates]
+        wanted = codes[len(codes) // 2]
+        model_json = ModelJson()
+        repeats = 1000
+
+        def load_json(path: Path) -> int:
+            loaded = Combination.schema().loads(path.read_text(encoding="utf-8"))
+            return sum(1 for i in loaded.candidates if i.code == wanted)
+
+        def ready_store(path: Path) -> int:
+            with ReadyStore(path) as store:
+                return 1 if store.get("candidates", wanted) else 0
+
+        def ready_store_many(path: Path) -> int:
+            with ReadyStore(path) as store:
+                return sum(
+                    1
+                    for i in range(repeats)
+                    if store.get("candidates", codes[i % len(codes)])
+                )
+
+        log = self._general.log
+        log.info("ready-lookup:")
+        log.info(f"  {'case':<32} {'items':>6} {'peak MB':>9} {'seconds':>8}")
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "all.json"
+            offsets = {"all": []}
+            with open(path, "wt", encoding="utf-8") as f:
+                records = model_json.dump_fan_out(
+                    combination, {"all": f}, lambda name, item: ["all"], offsets
+                )
+            index = ReadyStore.build_index(path, records["all"], offsets["all"])
+            ReadyStore.index_path(path).write_bytes(index)
+
+            cases = {
+                "load json file": lambda: load_json(path),
+                "ready store": lambda: ready_store(path),
+                f"ready store, {repeats} lookups": lambda: ready_store_many(path),
+            }
+            for name, func in cases.items():
+                count, peak, seconds = self._measure_peak_memory(func)
+                log.info(
+                    f"  {name:<32} {count:>6} {peak / 1024 / 1024:>9.1f} {seconds:>8.3f}"
+                )
+
+    def ready_bundles(self) -> None:
+        """Compare the time used to build the ballot bundles for all the elections
+        in one process and in a process for each election,
+        and the size of the bundles with the size of the election files."""
+        all_path = self.raw_path.parent / "ready" / "all.json"
+        c = Combination.schema().loads(all_path.read_text(encoding="utf-8"))
+
+        log = self._general.log
+        log.info("ready-bundles:")
+        log.info(f"  {'case':<32} {'files':>6} {'MB':>9} {'seconds':>8}")
+        workers_cases = [("one process", 1), ("process per election", len(c.elections))]
+        for name, workers in workers_cases:
+            start = time.perf_counter()
+            bundles = list(ReadyBundles(workers).build(c))
+            seconds = time.perf_counter() - start
+            size = sum(len(i.content) for i in bundles)
+            log.info(
+                f"  {name:<32} {len(bundles):>6} {size / 1024 / 1024:>9.2f} {seconds:>8.3f}"
+            )
+
+        files = [i for i in bundles if not i.name.endswith(ReadyBundles.index_name)]
+        largest = max(len(i.content) for i in files)
+        election_size = max(
+            (all_path.parent / f"{i.code}.json").stat().st_size for i in c.elections
+        )
+        log.info(
+            f"  mean bundle {sum(len(i.content) for i in files) / len(files) / 1024:.1f} KB, "
+            f"largest bundle {largest / 1024:.1f} KB, "
+            f"largest election file {election_size / 1024:.1f} KB"
+        )
+
+    def parallel_build(self) -> None:
+        """Compare the time used to build all the raw elections
+        in one process and in a pool of processes,
+        and check that the result is the same."""
+        model_json = ModelJson()
+        process = Process(use_cache=False)
+        count = len(process.election_dirs())
+
+        log = self._general.log
+        log.info("parallel-build:")
+        log.info(f"  {'jobs':<8} {'elections':>9} {'seconds':>8} {'speed-up':>8} same")
+        serial_seconds = None
+        serial_text = None
+        for jobs in [1, 2, 4]:
+            start = time.perf_counter()
+            c = process.build_all(jobs)
+            seconds = time.perf_counter() - start
+            text = model_json.dumps(c)
+            if serial_seconds is None:
+                serial_seconds = seconds
+                serial_text = text
+            log.info(
+                f"  {jobs:<8} {count:>9} {seconds:>8.3f} "
+                f"{serial_seconds / seconds:>7.2f}x {text == serial_text}"
+            )
+
+    def incremental_build(self) -> None:
+        """Compare the time used to build all the raw elections
+        without artifacts, and when every election is loaded from its artifact,
+        and check that the result is the same."""
+        model_json = ModelJson()
+        process = Process(use_cache=False)
+
+        log = self._general.log
+        log.info("incremental-build:")
+        log.info(f"  {'case':<24} {'loaded':>6} {'built':>6} {'seconds':>8} same")
+        with tempfile.TemporaryDirectory() as temp_dir:
+            process.artifacts = ElectionArtifacts(Path(temp_dir))
+            expected = None
+            for name in ["no artifacts", "all artifacts"]:
+                process.artifacts.hits = process.artifacts.misses = 0
+                start = time.perf_counter()
+                c = process.build_all()
+                seconds = time.perf_counter() - start
+                text = model_json.dumps(c)
+                expected = expected or text
+                log.info(
+                    f"  {name:<24} {process.artifacts.hits:>6} "
+                    f"{process.artifacts.misses:>6} {seconds:>8.3f} {text == expected}"
+                )
+
+    def shard_balance(self) -> None:
+        """Compare the largest shard of the raw elections
+        when the shards are balanced by size and when they are given
+        the same number of directories."""
+        process = Process(use_cache=False)
+        shards = Shards()
+        election_dirs = process.election_dirs()
+        sizes = {
+            path.name: sum(i.stat().st_size for i in path.rglob("*") if i.is_file())
+            for path in election_dirs
+        }
+        total = sum(sizes.values())
+
+        log = self._general.log
+        log.info("shard-balance:")
+        log.info(
+            f"  {'shards':<8} {'by size MB':>10} {'by count MB':>11} {'ideal MB':>8}"
+        )
+        for count in [2, 3, 4]:
+            by_size = shards.assign(sizes, count)
+            by_count = [list(sizes)[i::count] for i in range(count)]
+            largest = [
+                max(sum(sizes[name] for name in shard) for shard in i)
+                for i in [by_size, by_count]
+            ]
+            log.info(
+                f"  {count:<8} {largest[0] / 1024 / 1024:>10.2f} "
+                f"{largest[1] / 1024 / 1024:>11.2f} "
+                f"{total / count / 1024 / 1024:>8.2f}"
+            )
+
+    def report_overhead(self) -> None:
+        """Compare the time used to build all the raw elections
+        with the build report disabled, enabled without tracing memory,
+        and enabled with tracing memory."""
+        log = self._general.log
+        log.info("report-overhead:")
+        log.info(f"  {'case':<32} {'seconds':>8}")
+        cases = {
+            "report disabled": Report(),
+            "report without memory": Report(enabled=True, trace_memory=False),
+            "report with memory": Report(enabled=True),
+        }
+        for name, report in cases.items():
+            process = Process(use_cache=False, general=General(report=report))
+            start = time.perf_counter()
+            process.build_all()
+            seconds = time.perf_counter() - start
+            report.stop()
+            log.info(f"  {name:<32} {seconds:>8.3f}")
+
+    def profile_overhead(self) -> None:
+        """Compare the time used to build all the raw elections
+        without profiling, sampling the stack every 5 ms, and with cProfile."""
+        log = self._general.log
+        log.info("profile-overhead:")
+        log.info(f"  {'case':<32} {'seconds':>8}")
+        with tempfile.TemporaryDirectory() as temp_dir:
+            directory = Path(temp_dir)
+            cases = {
+                "no profiling": Profiler(),
+                "sampling every 5 ms": Profiler(directory, sample_interval=0.005),
+                "cProfile": Profiler(directory),
+            }
+            for name, profiler in cases.items():
+                process = Process(use_cache=False, general=General(profiler=profiler))
+                start = time.perf_counter()
+                process.build_all()
+                seconds = time.perf_counter() - start
+                log.info(f"  {name:<32} {seconds:>8.3f}")
+
+    def _write_large_feed(self, path: Path, repeats: int) -> int:
+        """Write a copy of the media feed with the contests repeated."""
+        with zipfile.ZipFile(self.federal_2019_path, "r") as z:
+            content = z.read(self.federal_2019_feed)
+        start_tag = b"<Contests>"
+        end_tag = b"</Contests>"
+        parts = []
+        position = 0
+        while (start := content.find(start_tag, position)) >= 0:
+            start += len(start_tag)
+            end = content.index(end_tag, start)
+            parts.append(content[position:start])
+            parts.append(content[start:end] * repeats)
+            position = end
+        parts.append(content[position:])
+        with open(path, "wb") as f:
+            for part in parts:
+                f.write(part)
+        return path.stat().st_size
+
+    def _measure_peak_memory(self, func: Callable) -> tuple:
+        """Measure the peak memory allocated while running a function."""
+        tracemalloc.start()
+        try:
+            start = time.perf_counter()
+            result = func()
+            seconds = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        return result, peak, seconds
+
+    def _measure_memory(self, func: Callable) -> tuple:
+        """Measure the memory allocated by the result of a function."""
+        tracemalloc.start()
+        try:
+            before = tracemalloc.get_traced_memory()[0]
+            start = time.perf_counter()
+            result = func()
+            seconds = time.perf_counter() - start
+            after = tracemalloc.get_traced_memory()[0]
+        finally:
+            tracemalloc.stop()
+        return result, after - before, seconds
+
+    def measure_isolated(self, func: Callable, *args) -> dict:
+        """Run a function in a new process and measure the wall time and
+        the peak resident set size."""
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            return executor.submit(_measure, func, *args).result()
+
+    def show_measures(self, title: str, measures: dict[str, dict]) -> None:
+        """Log a table of measurements."""
+        log = self._general.log
+        log.info(f"{title}:")
+        log.info(f"  {'case':<32} {'seconds':>9} {'peak MB':>9} {'added MB':>9}")
+        for name, m in measures.items():
+            log.info(
+                f"  {name:<32} {m['seconds']:>9.3f} "
+                f"{m['peak_rss'] / 1024 / 1024:>9.1f} "
+                f"{m['added_rss'] / 1024 / 1024:>9.1f}"
+            )
+
+
+def _measure(func: Callable, *args) -> dict:
+    """Measure a function call in the current process."""
+    before = _peak_rss()
+    start = time.perf_counter()
+    result = func(*args)
+    seconds = time.perf_counter() - start
+    after = _peak_rss()
+    return {
+        "seconds": seconds,
+        "peak_rss": after,
+        "added_rss": after - before,
+        "result": result,
+    }
+
+
+def _peak_rss() -> int:
+    """Get the peak resident set size of the current process in bytes."""
+    # prefer the high water mark of the process memory,
+    # as ru_maxrss can include the peak of the parent process
+    status = Path("/proc/self/status")
+    if status.exists():
+        for line in status.read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) * 1024
+
+    # linux reports kilobytes
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _element_to_dict(element: Element) -> dict:
+    """Convert an element into nested dicts, as the xml was read before compact nodes."""
+    return {
+        "tag": element.tag,
+        "attributes": element.attrib,
+        "text": (element.text or "").strip(),
+        "tail": (element.tail or "").strip(),
+        "children": [_element_to_dict(child) for child in element],
+    }
+
+
+def _synthetic_result(number: int) -> Result:
+    """Build a result with a code made from a number."""
+    return Result(
+        code=f"result-{number:07d}",
+        title=f"Result {number}",
+        value=number,
+        category=Result.category_people_count(),
+        ancestor_codes=[],
+        child_codes=[],
+        notes=[],
+        election_code="election",
+        assembly_code="assembly",
+        electorate_code="electorate",
+        ballot_code="ballot",
+    )
+
+
+def _normalise_notes_by_scan(collection: list[Note]) -> list[Note]:
+    """Normalise notes as before the sort key was cached,
+    finding each note by scanning the result."""
+
+    def order_id(note: Note) -> str:
+        d = "-"
+        return d.join(
+            [
+                slugify(note.category, delim=d),
+                slugify(note.display, delim=d),
+                slugify(note.content, delim=d),
+            ]
+        )
+
+    result = []
+    for item in sorted(collection, key=order_id):
+        existing = next((i for i in result if i.identity == item.identity), None)
+        if existing:
+            existing.merge_in(item)
+        else:
+            result.append(item)
+    return result
@@ -1,5 +1,6 @@
 from src.helper.aec import AEC
 from src.helper.general import General
+from src.helper.zip_members import ZipMembers
 from src.model.candidate import Candidate
 from src.model.combination import Combination
 from src.model.election import Election
@@ -25,7 +26,8 @@ class AuAecCandidatesV1:
         house_reps = self._aec.get_assembly_house_reps(combination)
         ind_title = self._aec.get_party_independent_title()
 
-        rows = original_data.get("2019federalelection-all-candidates-nat-17-05.csv")
+        filename = "2019federalelection-all-candidates-nat-17-05.csv"
+        rows = original_data.get(filename)
 
         for row in rows:
             # nom_ty = row.get("nom_ty", "").strip()
@@ -140,6 +142,8 @@ class AuAecCandidatesV1:
             combination.add(electorate)
             combination.add(candidate)
 
+        ZipMembers.release_in(original_data, filename)
+
         a = 1
 
 
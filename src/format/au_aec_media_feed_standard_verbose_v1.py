@@ -1,5 +1,8 @@
 from src.helper.aec import AEC
 from src.helper.general import General
+from src.helper.xml_node import XmlNode
+from src.helper.xml_stream import XmlStream
+from src.helper.zip_members import ZipMembers
 from src.model.assembly import Assembly
 from src.model.ballot import Ballot
 from src.model.candidate import Candidate
@@ -16,6 +19,10 @@ class AuAecMediaFeedStandardVerboseV1:
     _ns_si = "{http://www.w3.org/2001/XMLSchema-instance}"
     _ns_mf = "{http://www.aec.gov.au/xml/schema/mediafeed}"
     _ns_eml = "{urn:oasis:names:tc:evs:schema:eml}"
+    _namespaces = {
+        "mf": "http://www.aec.gov.au/xml/schema/mediafeed",
+        "eml": "urn:oasis:names:tc:evs:schema:eml",
+    }
 
     _input_aec_id_key = "AEC Election ID"
 
@@ -41,6 +48,7 @@ class AuAecMediaFeedStandardVerboseV1:
         original = original_data.get(filename)
         if original:
             self._media_feed(combination, original)
+        ZipMembers.release_in(original_data, filename)
 
     def get_assemblies(self):
         pass
@@ -51,115 +59,123 @@ class AuAecMediaFeedStandardVerboseV1:
     def get_notes(self):
         pass
 
-    def _media_feed(self, combination: Combination, d: dict):
-        t = d["tag"]
+    def _media_feed(self, combination: Combination, stream: XmlStream):
+        event_path = "mf:Results/eml:EventIdentifier"
+        election_path = "mf:Results/mf:Election/eml:ElectionIdentifier"
+        contest_path = "mf:Results/mf:Election/*/mf:Contests/mf:Contest"
+
+        result = {}
+        # the contests for each election in the feed, such as 'H' and 'S'
+        contests: dict[str, list[dict]] = {}
+        election_id = None
+        for match in stream.select(
+            event_path, election_path, contest_path, namespaces=self._namespaces
+        ):
+            if match.path == event_path:
+                # the root only contains the elements before the results
+                root = XmlNode.from_element(match.ancestors[0])
+                result = self._get_media_feed(root)
+                result["results"] = self._get_results(
+                    root.find("mf:Results", self._namespaces), match.node()
+                )
+            elif match.path == election_path:
+                election_id = match.node().attributes.get("Id")
+            else:
+                contest = self._get_contest(match.node())
+                contests.setdefault(election_id, []).append(contest)
+
+        if result:
+            result["results"]["representatives"] = self._get_representatives(
+                contests.get("H", [])
+            )
+            result["results"]["senate"] = self._get_senate(contests.get("S", []))
+        return result
+
+    def _get_media_feed(self, n: XmlNode):
+        t = n.tag
         assert t == f"{self._ns_mf}MediaFeed"
 
-        a = d["attributes"]
-        c = d["children"]
-        result = {
+        a = n.attributes
+        ns = self._namespaces
+        cycle = n.find("mf:Cycle", ns)
+        return {
             "id": a.get("Id"),
             "created": a.get("Created"),
             "schema_version": a.get("SchemaVersion"),
             "eml_version": a.get("EmlVersion"),
             "schema_location": a.get(f"{self._ns_si}schemaLocation"),
             "managing_auth": self._get_managing_auth(
-                next(
-                    (i for i in c if i["tag"] == f"{self._ns_mf}ManagingAuthority"), {}
-                )
-            ),
-            "language": next(
-                (i["text"] for i in c if i["tag"] == f"{self._ns_mf}MessageLanguage"),
-                None,
-            ),
-            "generator": self._get_msg_generator(
-                next((i for i in c if i["tag"] == f"{self._ns_mf}MessageGenerator"), {})
+                n.find("mf:ManagingAuthority", ns)
             ),
-            "cycle": next(
-                (
-                    {"id": i["text"], "created": i["attributes"].get("Created")}
-                    for i in c
-                    if i["tag"] == f"{self._ns_mf}Cycle"
-                ),
-                {},
-            ),
-            "results": self._get_results(
-                next((i for i in c if i["tag"] == f"{self._ns_mf}Results"), {})
+            "language": n.findtext("mf:MessageLanguage", None, ns),
+            "generator": self._get_msg_generator(n.find("mf:MessageGenerator", ns)),
+            "cycle": (
+                {"id": cycle.text, "created": cycle.attributes.get("Created")}
+                if cycle is not None
+                else {}
             ),
         }
-        return result
 
-    def _get_managing_auth(self, d: dict):
-        t = d["tag"]
+    def _get_managing_auth(self, n: XmlNode):
+        if n is None:
+            return []
+
+        t = n.tag
         assert t == f"{self._ns_mf}ManagingAuthority"
 
-        c = d["children"]
-        return [self._get_auth_id(i) for i in c]
+        return [self._get_auth_id(i) for i in n.children]
 
-    def _get_auth_id(self, d: dict):
-        t = d["tag"]
+    def _get_auth_id(self, n: XmlNode):
+        t = n.tag
         assert t == f"{self._ns_eml}AuthorityIdentifier"
 
-        a = d["attributes"]
-        return {"id": a.get("Id"), "text": d.get("text")}
+        return {"id": n.attributes.get("Id"), "text": n.text}
 
-    def _get_msg_generator(self, d: dict):
-        t = d["tag"]
+    def _get_msg_generator(self, n: XmlNode):
+        if n is None:
+            return {}
+
+        t = n.tag
         assert t == f"{self._ns_mf}MessageGenerator"
 
-        c = d["children"]
-        return dict([(i["tag"].replace(self._ns_mf, "").lower(), i["text"]) for i in c])
+        return dict(
+            [(i.tag.replace(self._ns_mf, "").lower(), i.text) for i in n.children]
+        )
 
-    def _get_results(self, d: dict):
-        t = d["tag"]
+    def _get_results(self, n: XmlNode, event: XmlNode):
+        t = n.tag
         assert t == f"{self._ns_mf}Results"
 
-        a = d["attributes"]
-        c = d["children"]
-
-        event = next((i for i in c if i["tag"] == f"{self._ns_eml}EventIdentifier"), {})
-
-        e = f"{self._ns_mf}Election"
-
-        result = {
+        a = n.attributes
+        return {
             "updated": a.get("Updated"),
             "phase": a.get("Phase"),
             "verbosity": a.get("Verbosity"),
             "granularity": a.get("Granularity"),
-            "id": event["attributes"].get("Id"),
-            "title": next(
-                (
-                    i["text"]
-                    for i in event["children"]
-                    if i["tag"] == f"{self._ns_eml}EventName"
-                ),
-                None,
-            ),
-            "representatives": self._get_representatives(
-                next(
-                    (
-                        i
-                        for i in c
-                        if i["tag"] == e and i["children"][0]["attributes"]["Id"] == "H"
-                    )
-                )
-            ),
-            "senate": self._get_senate(
-                next(
-                    (
-                        i
-                        for i in c
-                        if i["tag"] == e and i["children"][0]["attributes"]["Id"] == "S"
-                    )
-                )
-            ),
+            "id": event.attributes.get("Id"),
+            "title": event.findtext("eml:EventName", None, self._namespaces),
+        }
+
+    def _get_contest(self, n: XmlNode):
+        t = n.tag
+        assert t == f"{self._ns_mf}Contest"
+
+        ns = self._namespaces
+        identifier = n.find("eml:ContestIdentifier", ns)
+        state = n.find("mf:PollingDistrictIdentifier/mf:StateIdentifier", ns)
+        if state is None:
+            state = n.find("mf:StateIdentifier", ns)
+        return {
+            "id": identifier.attributes.get("Id"),
+            "name": identifier.findtext("eml:ContestName", None, ns),
+            "state": state.attributes.get("Id"),
+            "enrolment": n.findtext("mf:Enrolment", None, ns),
         }
-        return result
 
-    def _get_representatives(self, d: dict):
+    def _get_representatives(self, contests: list[dict]):
         #         'tag' = {str} '{http://www.aec.gov.au/xml/schema/mediafeed}Election'
         # 'attributes' = {dict: 1} {'Updated': '2019-07-11T13:58:18'}
         pass
 
-    def _get_senate(self, d: dict):
+    def _get_senate(self, contests: list[dict]):
         pass
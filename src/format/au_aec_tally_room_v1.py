@@ -2,6 +2,7 @@ from typing import Callable
 
 from src.helper.aec import AEC
 from src.helper.general import General
+from src.helper.zip_members import ZipMembers
 from src.model.assembly import Assembly
 from src.model.candidate import Candidate
 from src.model.combination import Combination
@@ -67,6 +68,7 @@ class AuAecTallyRoomV1:
             if data:
                 process(data, combination, election)
                 processed.add(filename)
+            ZipMembers.release_in(original_data, filename)
 
         # check if anything was missed
         original_available = {
@@ -96,7 +98,10 @@ class AuAecTallyRoomV1:
 
     def _info_electorate_code(self, assembly: Assembly, item: dict):
         title = self._info_electorate_title(item)
-        code = self._general.electorate_code(assembly.code, title)
+        return self._electorate_code(assembly, title)
+
+    def _electorate_code(self, assembly: Assembly, electorate_title: str):
+        code = self._general.electorate_code(assembly.code, electorate_title)
         if not code:
             raise ValueError("Electorate must have code.")
         return code
@@ -230,19 +235,24 @@ class AuAecTallyRoomV1:
         part_code, _ = Result.participated_code_title()
         not_part_code, _ = Result.not_participated_code_title()
 
-        title = self._info_electorate_title(item)
-        title = f"{title} {enrol_title}"
+        # find the electorate title once and build each code from it
+        g = self._general
+        electorate_title = self._info_electorate_title(item)
+        title = f"{electorate_title} {enrol_title}"
 
-        code = self._info_result_electorate_code(assembly, item, enrol_code)
+        code = g.result_electorate_code(assembly.code, electorate_title, enrol_code)
         category = Result.category_people_count()
-        ancestor_codes = [self._info_result_electorate_code(assembly, item, pop_code)]
+        pop_result_code = g.result_electorate_code(
+            assembly.code, electorate_title, pop_code
+        )
+        ancestor_codes = [pop_result_code]
         child_codes = [
-            self._info_result_electorate_code(assembly, item, not_part_code),
-            self._info_result_electorate_code(assembly, item, pop_code),
+            g.result_electorate_code(assembly.code, electorate_title, not_part_code),
+            pop_result_code,
         ]
         notes = self._create_notes(item)
-        electorate_code = self._info_electorate_code(assembly, item)
-        ballot_code = self._info_ballot_code(assembly, item)
+        electorate_code = self._electorate_code(assembly, electorate_title)
+        ballot_code = g.ballot_code(assembly.code, electorate_title)
 
         return Result(
             code=code,
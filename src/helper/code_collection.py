@@ -0,0 +1,186 @@
+from bisect import bisect_right
+from operator import attrgetter
+from typing import Any, Collection, Iterable, Optional, SupportsIndex, Union
+
+from src.helper.report import Report
+
+
+class CodeCollection(list):
+    """A list of items that also indexes the items by their code.
+
+    The list keeps the order the items were added,
+    and the index finds the first item with a code without a scan.
+    Items can also be grouped by another field,
+    and the groups are kept until the collection changes.
+    Item codes and grouped fields must not change
+    while an item is in the collection.
+    The items added, merged and found are counted in the report, if there is one.
+    """
+
+    def __init__(self, items: Iterable = ()):
+        super().__init__(items)
+        self.report: Optional[Report] = None
+        self._index: dict[str, Any] = {}
+        self._groups: dict[str, dict[str, list]] = {}
+        self._reindex()
+
+    @classmethod
+    def find_code(cls, collection: Collection, code: str) -> Optional[Any]:
+        """Find the first item with a code,
+        using the index if the collection is a CodeCollection.
+        A lookup in the index counts as one comparison."""
+        if isinstance(collection, CodeCollection):
+            collection._count("find_in comparisons")
+            return collection.find(code)
+        return next((i for i in collection if i.code == code), None)
+
+    @classmethod
+    def add_or_merge(cls, collection: list, item: Any) -> None:
+        """Add an item to a collection,
+        or merge it into the item that the item's class finds in the collection.
+        Counts the items added and the items merged into an existing item."""
+        existing = item.find_in(collection, item)
+        if isinstance(collection, CodeCollection):
+            collection._count("items merged" if existing else "items added")
+        if existing:
+            existing.merge_in(item)
+        else:
+            collection.append(item)
+
+    @classmethod
+    def merge_sorted(cls, collection: Collection, items: Iterable) -> "CodeCollection":
+        """Merge items into a collection that is sorted by code.
+
+        Items with a code that is already in the collection are merged
+        into the existing item, and the other items are added.
+        Only the added items are sorted and indexed,
+        and the place of each one is found by a binary search,
+        so the Python work depends on the number of items, not the collection.
+        """
+        if not isinstance(collection, CodeCollection):
+            collection = CodeCollection(sorted(collection, key=_code))
+
+        added = CodeCollection()
+        for item in items:
+            existing = collection.find(item.code)
+            if existing is None:
+                existing = added.find(item.code)
+            if existing is None:
+                added.append(item)
+            else:
+                collection._count("items merged")
+                existing.merge_in(item)
+
+        collection._count("items added", len(added))
+        if added:
+            added.sort(key=_code)
+            collection._insert_sorted(added)
+        return collection
+
+    def find(self, code: str) -> Optional[Any]:
+        """Find the first item with a code."""
+        return self._index.get(code)
+
+    def group_by(self, field: str) -> dict[str, list]:
+        """Group the items by the value of a field, keeping the order of the items.
+        Items that do not have the field, or have an empty value, are left out."""
+        groups = self._groups.get(field)
+        if groups is None:
+            groups = {}
+            get = attrgetter(field)
+            for item in self:
+                try:
+                    value = get(item)
+                except AttributeError:
+                    continue
+                if value:
+                    groups.setdefault(value, []).append(item)
+            self._groups[field] = groups
+        return groups
+
+    def append(self, item: Any) -> None:
+        super().append(item)
+        self._index.setdefault(item.code, item)
+        if self._groups:
+            self._groups = {}
+
+    def extend(self, items: Iterable) -> None:
+        for item in items:
+            self.append(item)
+
+    def __iadd__(self, items: Iterable) -> "CodeCollection":
+        self.extend(items)
+        return self
+
+    def insert(self, index: SupportsIndex, item: Any) -> None:
+        super().insert(index, item)
+        self._reindex()
+
+    def remove(self, item: Any) -> None:
+        super().remove(item)
+        self._reindex()
+
+    def pop(self, index: SupportsIndex = -1) -> Any:
+        item = super().pop(index)
+        self._reindex()
+        return item
+
+    def clear(self) -> None:
+        super().clear()
+        self._index.clear()
+        self._groups = {}
+
+    def __setitem__(self, index: Union[SupportsIndex, slice], value: Any) -> None:
+        super().__setitem__(index, value)
+        self._reindex()
+
+    def __delitem__(self, index: Union[SupportsIndex, slice]) -> None:
+        super().__delitem__(index)
+        self._reindex()
+
+    def sort(self, *args, **kwargs) -> None:
+        super().sort(*args, **kwargs)
+        self._groups = {}
+        # each item is the first with its code unless there are duplicate codes
+        if len(self._index) != len(self):
+            self._reindex()
+
+    def reverse(self) -> None:
+        super().reverse()
+        self._reindex()
+
+    def copy(self) -> "CodeCollection":
+        return CodeCollection(self)
+
+    def __reduce__(self):
+        return self.__class__, (list(self),)
+
+    def _insert_sorted(self, items: list) -> None:
+        """Insert items that are sorted by code into this collection,
+        which is also sorted by code.
+        Items go after the existing items with the same code, as a stable sort does."""
+        merged = []
+        start = 0
+        for item in items:
+            position = bisect_right(self, item.code, start, key=_code)
+            merged.extend(list.__getitem__(self, slice(start, position)))
+            merged.append(item)
+            start = position
+        merged.extend(list.__getitem__(self, slice(start, None)))
+        # replace the items in one step, then only index the inserted items
+        list.__setitem__(self, slice(None), merged)
+        for item in items:
+            self._index.setdefault(item.code, item)
+        self._groups = {}
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        if self.report is not None:
+            self.report.count(name, amount)
+
+    def _reindex(self) -> None:
+        self._groups = {}
+        # later items are replaced by the first item with the same code
+        self._index = {item.code: item for item in reversed(self)}
+
+
+_code = attrgetter("code")
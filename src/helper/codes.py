@@ -0,0 +1,68 @@
+import re
+from functools import lru_cache
+
+from boltons.strutils import slugify
+
+
+class Codes:
+    """Build slugs and clean titles, remembering recent results.
+
+    The same titles are seen many times while reading an election,
+    so each distinct value is only converted once
+    while it is in the least recently used cache.
+    """
+
+    default_max_size = 65536
+
+    _delim = "-"
+    _spaces = re.compile(r"\s+")
+
+    def __init__(self, max_size: int = default_max_size):
+        self._max_size = max_size
+        self._slug = lru_cache(maxsize=max_size)(self._build_slug)
+        self._collapse = lru_cache(maxsize=max_size)(self._build_collapse)
+
+    def __getstate__(self) -> dict:
+        # the caches wrap bound methods, which cannot be pickled,
+        # so a copy in another process starts with empty caches
+        return {"max_size": self._max_size}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(state["max_size"])
+
+    @property
+    def hits(self) -> int:
+        """The number of values that were found in the cache."""
+        return self._slug.cache_info().hits + self._collapse.cache_info().hits
+
+    @property
+    def misses(self) -> int:
+        """The number of values that had to be converted."""
+        return self._slug.cache_info().misses + self._collapse.cache_info().misses
+
+    @property
+    def hit_rate(self) -> float:
+        """The fraction of values that were found in the cache."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def slug(self, value: str) -> str:
+        """Convert a value to lower case words joined by the delimiter."""
+        return self._slug(value)
+
+    def collapse_spaces(self, value: str) -> str:
+        """Replace each run of whitespace with one space."""
+        return self._collapse(value or "")
+
+    def summary(self) -> str:
+        """Describe how well the cache worked."""
+        return (
+            f"Code cache: {self.hits} hits, {self.misses} misses "
+            f"({self.hit_rate:.0%} hit rate)."
+        )
+
+    def _build_slug(self, value: str) -> str:
+        return slugify(value, delim=self._delim)
+
+    def _build_collapse(self, value: str) -> str:
+        return self._spaces.sub(" ", value)
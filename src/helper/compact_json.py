@@ -0,0 +1,241 @@
+import dataclasses
+import json
+import typing
+from pathlib import Path
+from typing import Any, Mapping, Optional, TextIO
+
+
+class CompactJson:
+    """Convert a Combination to and from a compact json format.
+
+    Every string is stored once in a string table and referred to by its index.
+    Each collection is stored as columns, one list per field,
+    so numbers such as result values are one list of numbers.
+    Nested items, such as notes, are stored once in a table for their class,
+    and referred to by their index.
+
+    The format looks like::
+
+        {
+          "format": "vote-plan-compact",
+          "version": 1,
+          "strings": ["...", ...],
+          "tables": {"Note": {"count": 2, "columns": {"category": [0, 0], ...}}},
+          "collections": {"results": {"count": 1, "columns": {"code": [3], ...}}}
+        }
+    """
+
+    format_name = "vote-plan-compact"
+    format_version = 1
+
+    def __init__(self, root: type):
+        self._root = root
+        self._fields: dict[type, list[tuple[str, str, Any]]] = {}
+
+    def dump(self, obj: Any, f: TextIO) -> None:
+        """Write the compact format."""
+        json.dump(self.encode(obj), f, separators=(",", ":"))
+
+    def dumps(self, obj: Any) -> str:
+        """Convert to the compact format text."""
+        return json.dumps(self.encode(obj), separators=(",", ":"))
+
+    def load(self, f: TextIO) -> Any:
+        """Read the compact format."""
+        return self.decode(json.load(f))
+
+    def loads(self, text: str) -> Any:
+        """Read the compact format text."""
+        return self.decode(json.loads(text))
+
+    def encode(self, obj: Any) -> dict:
+        """Convert an object with list fields into the compact format."""
+        state = _EncodeState()
+        collections = {}
+        for name, attr, hint in self.fields(type(obj)):
+            (item_cls,) = typing.get_args(hint)
+            collections[name] = self._encode_table(state, item_cls, getattr(obj, attr))
+        return {
+            "format": self.format_name,
+            "version": self.format_version,
+            "strings": state.strings,
+            "tables": {
+                cls.__name__: self._encode_table(state, cls, items)
+                for cls, items in state.nested_items.items()
+            },
+            "collections": collections,
+        }
+
+    def decode(self, data: dict) -> Any:
+        """Build the object from the compact format."""
+        if data.get("format") != self.format_name:
+            raise ValueError("Not in the compact format.")
+        if data.get("version") != self.format_version:
+            raise ValueError(f"Unknown compact format version '{data.get('version')}'.")
+
+        state = _DecodeState(data["strings"], data["tables"])
+        collections = data["collections"]
+        values = {}
+        for name, attr, hint in self.fields(self._root):
+            (item_cls,) = typing.get_args(hint)
+            values[attr] = self._decode_table(state, item_cls, collections[name])
+        return self._root(**values)
+
+    def check_structure(self, path: Path, counts: Mapping[str, int]) -> None:
+        """Check that a written file is in the compact format,
+        with the number of items that were written in each collection,
+        and a column for each field of the items, without building the objects."""
+        with open(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+
+        if (
+            not isinstance(data, dict)
+            or data.get("format") != self.format_name
+            or data.get("version") != self.format_version
+        ):
+            raise ValueError(f"Json file '{path}' is not in the compact format.")
+
+        collections = data.get("collections")
+        fields = self.fields(self._root)
+        if not isinstance(collections, dict) or sorted(collections) != [
+            name for name, _, _ in fields
+        ]:
+            raise ValueError(f"Json file '{path}' does not have the collections.")
+
+        for name, attr, hint in fields:
+            (item_cls,) = typing.get_args(hint)
+            table = collections[name]
+            count = table.get("count")
+            if attr in counts and count != counts[attr]:
+                raise ValueError(
+                    f"Json file '{path}' does not have {counts[attr]} {name}."
+                )
+            columns = table.get("columns", {})
+            item_names = [i for i, _, _ in self.fields(item_cls)]
+            if sorted(columns) != item_names or any(
+                len(i) != count for i in columns.values()
+            ):
+                raise ValueError(
+                    f"Json file '{path}' has {name} without the fields of {item_cls}."
+                )
+
+    def fields(self, cls: type) -> list[tuple[str, str, Any]]:
+        """Get the json name, attribute name and type of each field,
+        sorted by json name."""
+        fields = self._fields.get(cls)
+        if fields is None:
+            letter_case = cls.dataclass_json_config["letter_case"]
+            hints = typing.get_type_hints(cls)
+            fields = sorted(
+                (letter_case(field.name), field.name, hints[field.name])
+                for field in dataclasses.fields(cls)
+            )
+            self._fields[cls] = fields
+        return fields
+
+    def _encode_table(self, state: "_EncodeState", cls: type, items: list) -> dict:
+        columns = {}
+        for name, attr, hint in self.fields(cls):
+            values = [getattr(item, attr) for item in items]
+            columns[name] = self._encode_column(state, hint, values)
+        return {"count": len(items), "columns": columns}
+
+    def _encode_column(self, state: "_EncodeState", hint: Any, values: list) -> list:
+        if hint is str:
+            return [state.string(v) for v in values]
+        if hint in (int, bool):
+            return values
+        if typing.get_origin(hint) is list:
+            # a missing list is stored as null, as in the full json format
+            (inner,) = typing.get_args(hint)
+            if inner is str:
+                return [
+                    None if v is None else [state.string(i) for i in v] for v in values
+                ]
+            if dataclasses.is_dataclass(inner):
+                return [
+                    None if v is None else [state.nested(self, inner, i) for i in v]
+                    for v in values
+                ]
+        raise ValueError(f"Cannot store type '{hint}' in the compact format.")
+
+    def _decode_table(self, state: "_DecodeState", cls: type, table: dict) -> list:
+        count = table["count"]
+        columns = table["columns"]
+        decoded = [
+            (attr, self._decode_column(state, hint, columns[name]))
+            for name, attr, hint in self.fields(cls)
+        ]
+        return [
+            cls(**{attr: column[i] for attr, column in decoded}) for i in range(count)
+        ]
+
+    def _decode_column(self, state: "_DecodeState", hint: Any, column: list) -> list:
+        strings = state.strings
+        if hint is str:
+            return [None if i is None else strings[i] for i in column]
+        if hint in (int, bool):
+            return column
+        (inner,) = typing.get_args(hint)
+        if inner is str:
+            return [
+                None if v is None else [None if i is None else strings[i] for i in v]
+                for v in column
+            ]
+
+        if not any(column):
+            return [None if v is None else [] for v in column]
+
+        # build a new nested item for each reference, so no item is shared
+        values = state.nested_values(self, inner)
+        return [None if v is None else [inner(**values[i]) for i in v] for v in column]
+
+
+class _EncodeState:
+    """The string table and nested items built while encoding."""
+
+    def __init__(self):
+        self.strings: list[str] = []
+        self._string_index: dict[str, int] = {}
+        self.nested_items: dict[type, list] = {}
+        self._nested_index: dict[type, dict[tuple, int]] = {}
+
+    def string(self, value: Optional[str]) -> Optional[int]:
+        if value is None:
+            return None
+        index = self._string_index.get(value)
+        if index is None:
+            index = len(self.strings)
+            self._string_index[value] = index
+            self.strings.append(value)
+        return index
+
+    def nested(self, compact: CompactJson, cls: type, item: Any) -> int:
+        key = tuple(getattr(item, attr) for _, attr, _ in compact.fields(cls))
+        index_by_key = self._nested_index.setdefault(cls, {})
+        index = index_by_key.get(key)
+        if index is None:
+            items = self.nested_items.setdefault(cls, [])
+            index = len(items)
+            index_by_key[key] = index
+            items.append(item)
+        return index
+
+
+class _DecodeState:
+    """The string table and nested item values used while decoding."""
+
+    def __init__(self, strings: list[str], tables: dict[str, dict]):
+        self.strings = strings
+        self._tables = tables
+        self._nested_values: dict[type, list[dict]] = {}
+
+    def nested_values(self, compact: CompactJson, cls: type) -> list[dict]:
+        values = self._nested_values.get(cls)
+        if values is None:
+            table = self._tables[cls.__name__]
+            fields = [attr for _, attr, _ in compact.fields(cls)]
+            items = compact._decode_table(self, cls, table)
+            values = [{f: getattr(i, f) for f in fields} for i in items]
+            self._nested_values[cls] = values
+        return values
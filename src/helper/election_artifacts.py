@@ -0,0 +1,141 @@
+import hashlib
+import inspect
+import os
+import pickle
+import sys
+import zipfile
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Iterable, Optional
+
+
+class ElectionArtifacts:
+    """Store the populated combination for each election on disk,
+    with a fingerprint of everything used to build it.
+
+    The fingerprint is written before the combination in each file,
+    so a changed election is found without loading its combination.
+    Each file is replaced in one step, so a build that fails part way
+    leaves the artifacts of the elections that were built.
+    """
+
+    _suffix = ".pickle"
+    _version = "1"
+
+    def __init__(self, directory: Path):
+        self._directory = directory
+
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def directory(self) -> Path:
+        """The directory that contains the artifact files."""
+        return self._directory
+
+    def fingerprint(self, parts: Iterable[str]) -> str:
+        """Combine the digests of the inputs of an election."""
+        digest = hashlib.sha256(self._version.encode("utf-8"))
+        for part in parts:
+            digest.update(b"\0")
+            digest.update(part.encode("utf-8"))
+        return digest.hexdigest()
+
+    def file_digest(self, path: Path) -> str:
+        """Get the hash of a file, or an empty string if it does not exist."""
+        if not path.exists():
+            return ""
+        return hashlib.sha256(path.read_bytes()).hexdigest()
+
+    def zip_digest(self, path: Path) -> str:
+        """Get a hash of the names, CRC32 and sizes in the central directory
+        of a zip file, or an empty string if it does not exist."""
+        if not path.exists():
+            return ""
+        digest = hashlib.sha256()
+        with zipfile.ZipFile(path, "r") as f:
+            for info in sorted(f.infolist(), key=lambda i: i.filename):
+                digest.update(
+                    f"{info.filename}|{info.CRC:08x}|{info.file_size}\n".encode("utf-8")
+                )
+        return digest.hexdigest()
+
+    def source_digest(self, modules: Iterable[ModuleType], package: str) -> str:
+        """Get a hash of the source of the modules,
+        and of the modules in the package that they use."""
+        digest = hashlib.sha256()
+        for path in sorted(_source_files(modules, package)):
+            digest.update(f"{path.name}\n".encode("utf-8"))
+            digest.update(path.read_bytes())
+        return digest.hexdigest()
+
+    def load(self, name: str, fingerprint: str) -> tuple[bool, Any]:
+        """Get the combination for an election if its fingerprint has not changed.
+        Returns whether it was found, and the combination."""
+        entry = self._entry(name)
+        if entry.exists():
+            try:
+                with open(entry, "rb") as f:
+                    if pickle.load(f) == fingerprint:
+                        value = pickle.load(f)
+                        self.hits += 1
+                        return True, value
+            except (OSError, EOFError, pickle.UnpicklingError, AttributeError):
+                # a damaged or outdated artifact is built again and replaced
+                entry.unlink(missing_ok=True)
+        self.misses += 1
+        return False, None
+
+    def save(self, name: str, fingerprint: str, value: Any) -> None:
+        """Store the combination for an election."""
+        self._directory.mkdir(parents=True, exist_ok=True)
+        entry = self._entry(name)
+        temp = entry.with_suffix(f".{os.getpid()}.tmp")
+        with open(temp, "wb") as f:
+            pickle.dump(fingerprint, f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp, entry)
+
+    def retain(self, names: Iterable[str]) -> None:
+        """Remove the artifacts of elections that no longer exist."""
+        if not self._directory.exists():
+            return
+        keep = {self._entry(i) for i in names}
+        for entry in self._directory.glob("*" + self._suffix):
+            if entry not in keep:
+                entry.unlink(missing_ok=True)
+
+    def summary(self) -> str:
+        """Describe how many elections were loaded instead of built."""
+        return (
+            f"Election artifacts: {self.hits} unchanged elections loaded, "
+            f"{self.misses} built."
+        )
+
+    def _entry(self, name: str) -> Path:
+        return self._directory / (name + self._suffix)
+
+
+def _source_files(modules: Iterable[ModuleType], package: str) -> set[Path]:
+    """Find the source files of the modules, and of the modules in the package
+    that they use, following the names each module imports."""
+    prefix = package + "."
+    pending = list(modules)
+    seen: set[str] = set()
+    files = set()
+    while pending:
+        module = pending.pop()
+        if module.__name__ in seen:
+            continue
+        seen.add(module.__name__)
+        source = inspect.getsourcefile(module)
+        if source:
+            files.add(Path(source))
+        for value in vars(module).values():
+            if isinstance(value, ModuleType):
+                used: Optional[ModuleType] = value
+            else:
+                used = sys.modules.get(getattr(value, "__module__", None) or "")
+            if used is not None and used.__name__.startswith(prefix):
+                pending.append(used)
+    return files
@@ -1,22 +1,48 @@
 import logging
-import re
 from functools import reduce
+from typing import Optional
 
-from boltons.strutils import slugify
+from src.helper.codes import Codes
+from src.helper.profiler import Profiler
+from src.helper.report import Report
 
 
 class General:
-    def __init__(self):
+    def __init__(
+        self,
+        codes_max_size: int = Codes.default_max_size,
+        report: Optional[Report] = None,
+        profiler: Optional[Profiler] = None,
+    ):
         msg_fmt = "%(asctime)s [%(levelname)8s] %(message)s"
         date_fmt = "%Y-%m-%dT%H:%M:%S"
         logging.basicConfig(level=logging.INFO, format=msg_fmt, datefmt=date_fmt)
         self._logger = logging.getLogger("data")
+        self._codes = Codes(codes_max_size)
+        # the report and profiler do nothing unless they are enabled
+        self._report = report or Report()
+        self._profiler = profiler or Profiler()
 
     @property
     def log(self):
         """Get the logger."""
         return self._logger
 
+    @property
+    def codes(self) -> Codes:
+        """Get the code and title builder."""
+        return self._codes
+
+    @property
+    def report(self) -> Report:
+        """Get the build report."""
+        return self._report
+
+    @property
+    def profiler(self) -> Profiler:
+        """Get the profiler."""
+        return self._profiler
+
     @property
     def _delim(self):
         return "-"
@@ -63,7 +89,7 @@ class General:
         return result
 
     def collapse_spaces(self, value: str):
-        result = re.sub(r"\s+", " ", value or "")
+        result = self._codes.collapse_spaces(value)
         return result
 
     def get_bool(self, value: str):
@@ -72,14 +98,14 @@ class General:
     def party_code(self, election_code: str, party_title: str):
         if not party_title or not party_title.strip():
             raise ValueError()
-        result = slugify(party_title.strip(), delim=self._delim)
+        result = self._codes.slug(party_title.strip())
         return self._delim.join([election_code, result])
 
     def electorate_code(self, assembly_code: str, electorate_title: str):
         if not electorate_title or not electorate_title.strip():
             return assembly_code
 
-        result = slugify(electorate_title.strip(), delim=self._delim)
+        result = self._codes.slug(electorate_title.strip())
         return self._delim.join([assembly_code, result])
 
     def candidate_code(
@@ -90,13 +116,13 @@ class General:
         if not name_last or not name_last.strip():
             raise ValueError()
         name = f"{name_last.strip()} {name_first.strip()}".strip()
-        result = slugify(name, delim=self._delim)
+        result = self._codes.slug(name)
         electorate_code = self.electorate_code(assembly_code, electorate_title)
         return self._delim.join([electorate_code, result])
 
     def result_electorate_code(self, assembly_code: str, name: str, suffix: str):
         electorate_code = self.electorate_code(assembly_code, name)
-        suffix = slugify(suffix, delim=self._delim)
+        suffix = self._codes.slug(suffix)
         result = self._delim.join([electorate_code, suffix])
         return result
 
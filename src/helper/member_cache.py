@@ -0,0 +1,150 @@
+import hashlib
+import inspect
+import os
+import pickle
+import zipfile
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Callable, Iterable, Optional
+
+
+class MemberCache:
+    """Store the parsed content of zip file members on disk.
+
+    Each entry is keyed by the zip file path, the member name, and the CRC32 and
+    uncompressed size from the zip central directory,
+    so a changed member is never read from the cache.
+    The key also includes the version of the cache format
+    and the variant given by the reader, which changes with the parsing code,
+    so entries pickled by older code are never read.
+    The least recently used entries are removed when the cache is too large.
+    """
+
+    _suffix = ".pickle"
+    _version = "1"
+
+    def __init__(self, directory: Path, max_bytes: int):
+        self._directory = directory
+        self._max_bytes = max_bytes
+        # the total size of the entries, found when the first entry is written
+        self._total_bytes: Optional[int] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.evicted = 0
+
+    @property
+    def directory(self) -> Path:
+        """The directory that contains the cache files."""
+        return self._directory
+
+    @property
+    def hit_rate(self) -> float:
+        """The fraction of reads that were found in the cache."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def key(self, path: Path, info: zipfile.ZipInfo, variant: str = "") -> str:
+        """Build the cache key for a zip file member.
+        The variant distinguishes different ways of parsing the same member."""
+        raw = "|".join(
+            [
+                self._version,
+                str(path.resolve()),
+                info.filename,
+                f"{info.CRC:08x}",
+                str(info.file_size),
+                variant,
+            ]
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def source_digest(self, modules: Iterable[ModuleType]) -> str:
+        """Get a hash of the source of the modules that parse the members,
+        for use in the variant."""
+        digest = hashlib.sha256()
+        for module in modules:
+            digest.update(Path(inspect.getsourcefile(module)).read_bytes())
+        return digest.hexdigest()
+
+    def get_or_read(
+        self,
+        path: Path,
+        info: zipfile.ZipInfo,
+        read: Callable[[], Any],
+        variant: str = "",
+    ) -> Any:
+        """Get the parsed content from the cache,
+        or read it and add it to the cache."""
+        entry = self._directory / (self.key(path, info, variant) + self._suffix)
+
+        if entry.exists():
+            try:
+                with open(entry, "rb") as f:
+                    result = pickle.load(f)
+            except (OSError, EOFError, pickle.UnpicklingError):
+                # a damaged entry is read again and replaced
+                entry.unlink(missing_ok=True)
+            else:
+                # record the use for least recently used eviction
+                os.utime(entry)
+                self.hits += 1
+                self.bytes_saved += info.file_size
+                return result
+
+        result = read()
+        self.misses += 1
+        size = self._write(entry, result)
+
+        # only look at every entry when the cache might be too large
+        if self._total_bytes is None:
+            self._total_bytes = self._size()
+        else:
+            self._total_bytes += size
+        if self._total_bytes > self._max_bytes:
+            self.evict()
+        return result
+
+    def evict(self) -> None:
+        """Remove the least recently used entries until the cache is small enough."""
+        entries = self._entries()
+        total = sum(s.st_size for _, s in entries)
+        for entry, stat in sorted(entries, key=lambda x: x[1].st_mtime):
+            if total <= self._max_bytes:
+                break
+            entry.unlink(missing_ok=True)
+            total -= stat.st_size
+            self.evicted += 1
+        self._total_bytes = total
+
+    def summary(self) -> str:
+        """Describe how well the cache worked."""
+        return (
+            f"Member cache: {self.hits} hits, {self.misses} misses "
+            f"({self.hit_rate:.0%} hit rate), "
+            f"{self.bytes_saved / 1024 / 1024:.1f} MB not parsed again, "
+            f"{self.evicted} evicted."
+        )
+
+    def _size(self) -> int:
+        return sum(s.st_size for _, s in self._entries())
+
+    def _entries(self) -> list[tuple[Path, os.stat_result]]:
+        entries = []
+        for entry in self._directory.glob("*" + self._suffix):
+            try:
+                entries.append((entry, entry.stat()))
+            except FileNotFoundError:
+                # removed by another process using the same cache
+                continue
+        return entries
+
+    def _write(self, entry: Path, value: Any) -> int:
+        self._directory.mkdir(parents=True, exist_ok=True)
+        temp = entry.with_suffix(f".{os.getpid()}.tmp")
+        with open(temp, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            size = f.tell()
+        os.replace(temp, entry)
+        return size
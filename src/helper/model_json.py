@@ -0,0 +1,309 @@
+import dataclasses
+import hashlib
+import json
+import typing
+from operator import attrgetter
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Hashable,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    Optional,
+    TextIO,
+)
+
+
+class JsonRecord(NamedTuple):
+    """What was written to a json file."""
+
+    sha256: str
+    """The hash of the text, encoded as utf-8."""
+
+    size: int
+    """The size of the text in bytes."""
+
+    counts: dict[str, int]
+    """The number of items in each list of the top-level object."""
+
+
+class ModelJson:
+    """Write the model dataclasses as json.
+
+    Gives the same text as the dataclasses_json schema with sorted keys,
+    using a table of the json names and converters for each class
+    that is built the first time the class is written.
+    Each top-level item is encoded separately and written to the file,
+    so the whole document is never held as one string.
+    """
+
+    _item_separator = ", "
+    _block_size = 1024 * 1024
+
+    def __init__(self):
+        self._tables: dict[type, list[tuple[str, str, Callable[[Any], Any]]]] = {}
+        # the converter for the items of each list converter
+        self._item_converters: dict[Callable, Callable] = {}
+        # the dataclass of the items of each list converter
+        self._item_classes: dict[Callable, type] = {}
+
+    def dump(self, obj: Any, f: TextIO) -> "JsonRecord":
+        """Write a dataclass as a json object.
+        The items in each list field are written one at a time.
+        Returns the hash and size of the text, and the number of items in each list."""
+        keys = (None,)
+        return self.dump_fan_out(obj, {None: f}, lambda attr, item: keys)[None]
+
+    def dump_fan_out(
+        self,
+        obj: Any,
+        files: dict[Hashable, Optional[TextIO]],
+        route: Callable[[str, Any], Iterable[Hashable]],
+        offsets: Optional[dict[Hashable, list]] = None,
+    ) -> dict[Hashable, "JsonRecord"]:
+        """Write the items in the list fields of a dataclass to several files.
+
+        Each file gets a json object with all the fields of the dataclass.
+        Each item is converted to json text once,
+        then written to the files with the keys given by
+        the route for the field attribute name and the item.
+        Fields that are not lists are written to every file.
+        A file can be None to only find what would be written.
+        Returns what was written to each file.
+
+        For each file key in offsets, the field attribute name, item,
+        byte offset and byte length of each item written to that file are added
+        to the list.
+        """
+        writers = {key: _HashingWriter(f) for key, f in files.items()}
+        counts: dict[Hashable, dict[str, int]] = {key: {} for key in files}
+        separator = self._item_separator
+
+        for writer in writers.values():
+            writer.write("{")
+        for position, (name, attr, convert) in enumerate(self.table(type(obj))):
+            prefix = f"{separator if position else ''}{json.dumps(name)}: "
+            value = getattr(obj, attr)
+            convert_item = self._item_converters.get(convert)
+            if convert_item is None or value is None:
+                text = prefix + json.dumps(convert(value))
+                for writer in writers.values():
+                    writer.write(text)
+                continue
+
+            written = dict.fromkeys(writers, 0)
+            for writer in writers.values():
+                writer.write(prefix + "[")
+            for item in value:
+                text = json.dumps(convert_item(item))
+                for key in route(attr, item):
+                    if key not in written:
+                        continue
+                    writer = writers[key]
+                    if written[key]:
+                        writer.write(separator)
+                    if offsets is not None and key in offsets:
+                        start = writer.size
+                        writer.write(text)
+                        offsets[key].append((attr, item, start, writer.size - start))
+                    else:
+                        writer.write(text)
+                    written[key] += 1
+            for key, writer in writers.items():
+                writer.write("]")
+                counts[key][name] = written[key]
+        for writer in writers.values():
+            writer.write("}")
+
+        return {
+            key: JsonRecord(writer.hexdigest(), writer.size, counts[key])
+            for key, writer in writers.items()
+        }
+
+    def dump_lines_fan_out(
+        self,
+        obj: Any,
+        files: dict[Hashable, Optional[TextIO]],
+        route: Callable[[str, Any], Iterable[Hashable]],
+    ) -> dict[Hashable, "JsonRecord"]:
+        """Write the items in the list fields of a dataclass to several files
+        as newline-delimited json.
+
+        Each line is a json object with the json name of the field as 'type',
+        and the item as 'item'.
+        The items of each field are written in order of their code.
+        Each item is converted to json text once, as for dump_fan_out.
+        """
+        writers = {key: _HashingWriter(f) for key, f in files.items()}
+        counts: dict[Hashable, dict[str, int]] = {key: {} for key in files}
+
+        for name, attr, convert in self.table(type(obj)):
+            convert_item = self._item_converters.get(convert)
+            if convert_item is None:
+                continue
+            written = dict.fromkeys(writers, 0)
+            prefix = f'{{"type": {json.dumps(name)}, "item": '
+            for item in sorted(getattr(obj, attr) or [], key=_code):
+                text = f"{prefix}{json.dumps(convert_item(item))}}}\n"
+                for key in route(attr, item):
+                    if key in written:
+                        writers[key].write(text)
+                        written[key] += 1
+            for key in writers:
+                counts[key][name] = written[key]
+
+        return {
+            key: JsonRecord(writer.hexdigest(), writer.size, counts[key])
+            for key, writer in writers.items()
+        }
+
+    def iter_lines(
+        self, path: Path, cls: type, types: Optional[Iterable[str]] = None
+    ) -> Iterator[tuple[str, Any]]:
+        """Read newline-delimited json one line at a time.
+        Yields the type and the item as an instance of the item class
+        of the matching list field of a class,
+        optionally only for some types."""
+        item_classes = {
+            name: self._item_classes[convert]
+            for name, _, convert in self.table(cls)
+            if convert in self._item_classes
+        }
+        wanted = set(types) if types is not None else None
+        with open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                data = json.loads(line)
+                name = data["type"]
+                if wanted is not None and name not in wanted:
+                    continue
+                yield name, self.from_dict(item_classes[name], data["item"])
+
+    def check_hash(self, path: Path, record: "JsonRecord") -> None:
+        """Check that a written file has the size and hash of the text
+        that was written, reading the file in blocks."""
+        digest = hashlib.sha256()
+        size = 0
+        with open(path, "rb") as f:
+            while block := f.read(self._block_size):
+                digest.update(block)
+                size += len(block)
+        if size != record.size or digest.hexdigest() != record.sha256:
+            raise ValueError(f"Json file '{path}' does not match what was written.")
+
+    def check_structure(self, path: Path, cls: type, record: "JsonRecord") -> None:
+        """Check that a written file is json with the names of the fields of a class,
+        the number of items that were written, and the names of the item fields,
+        without building the dataclasses."""
+        with open(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+
+        if not isinstance(data, dict) or list(data) != self.names(cls):
+            raise ValueError(f"Json file '{path}' does not have the fields of {cls}.")
+
+        for name, attr, convert in self.table(cls):
+            if name not in record.counts:
+                continue
+            items = data[name]
+            if not isinstance(items, list) or len(items) != record.counts[name]:
+                raise ValueError(
+                    f"Json file '{path}' does not have {record.counts[name]} {name}."
+                )
+            item_cls = self._item_classes.get(convert)
+            if item_cls is None:
+                continue
+            item_names = self.names(item_cls)
+            if any(not isinstance(i, dict) or list(i) != item_names for i in items):
+                raise ValueError(
+                    f"Json file '{path}' has {name} without the fields of {item_cls}."
+                )
+
+    def dumps(self, obj: Any) -> str:
+        """Convert a dataclass to json text."""
+        return json.dumps(self.to_dict(obj))
+
+    def to_dict(self, obj: Any) -> dict:
+        """Convert a dataclass to a dict with the json names in sorted order."""
+        return {
+            name: convert(getattr(obj, attr))
+            for name, attr, convert in self.table(type(obj))
+        }
+
+    def from_dict(self, cls: type, data: dict) -> Any:
+        """Build a dataclass from a dict with the json names."""
+        values = {}
+        for name, attr, convert in self.table(cls):
+            value = data[name]
+            item_cls = self._item_classes.get(convert)
+            if item_cls is not None and value is not None:
+                value = [self.from_dict(item_cls, i) for i in value]
+            values[attr] = value
+        return cls(**values)
+
+    def names(self, cls: type) -> list[str]:
+        """Get the sorted json names of the fields of a class."""
+        return [name for name, _, _ in self.table(cls)]
+
+    def table(self, cls: type) -> list[tuple[str, str, Callable[[Any], Any]]]:
+        """Get the json name, attribute name and converter for each field,
+        sorted by json name."""
+        table = self._tables.get(cls)
+        if table is None:
+            letter_case = cls.dataclass_json_config["letter_case"]
+            hints = typing.get_type_hints(cls)
+            table = sorted(
+                (
+                    letter_case(field.name),
+                    field.name,
+                    self._converter(hints[field.name]),
+                )
+                for field in dataclasses.fields(cls)
+            )
+            self._tables[cls] = table
+        return table
+
+    def _converter(self, hint: Any) -> Callable[[Any], Any]:
+        """Build a function that converts a value the same way as the schema."""
+        if typing.get_origin(hint) is list:
+            (inner_hint,) = typing.get_args(hint)
+            inner = self._converter(inner_hint)
+            convert = lambda v: None if v is None else [inner(i) for i in v]
+            self._item_converters[convert] = inner
+            if dataclasses.is_dataclass(inner_hint):
+                self._item_classes[convert] = inner_hint
+            return convert
+        if dataclasses.is_dataclass(hint):
+            return lambda v: None if v is None else self.to_dict(v)
+        if hint is str:
+            return lambda v: None if v is None else str(v)
+        if hint is int:
+            return lambda v: None if v is None else int(v)
+        if hint is bool:
+            return lambda v: None if v is None else bool(v)
+        raise ValueError(f"Cannot convert type '{hint}' to json.")
+
+
+class _HashingWriter:
+    """Write text to a file and hash the text that was written.
+    Without a file, the text is only hashed."""
+
+    def __init__(self, f: Optional[TextIO]):
+        self._f = f
+        self._digest = hashlib.sha256()
+        self.size = 0
+
+    def write(self, text: str) -> None:
+        data = text.encode("utf-8")
+        self._digest.update(data)
+        self.size += len(data)
+        if self._f is not None:
+            self._f.write(text)
+
+    def hexdigest(self) -> str:
+        return self._digest.hexdigest()
+
+
+_code = attrgetter("code")
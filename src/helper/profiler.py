@@ -0,0 +1,207 @@
+import cProfile
+import io
+import logging
+import pstats
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from types import FrameType
+from typing import ContextManager, Iterator, Optional
+
+from boltons.strutils import slugify
+
+
+class Profiler:
+    """Profile stages of a build, such as each parser and format populate,
+    writing one file for each election and stage.
+
+    By default each stage is run with cProfile and written as a '.pstats' file.
+    With a sample interval, the stack of the thread running the stage
+    is sampled at that interval instead,
+    and written as collapsed stacks in a '.folded' file,
+    which flame graph tools can read.
+    The functions with the most cumulative time or samples are logged.
+
+    A profiler that is not enabled does nothing.
+    The profiler is given to the code it profiles through General.
+    """
+
+    pstats_suffix = ".pstats"
+    folded_suffix = ".folded"
+    default_top = 20
+
+    _disabled_stage = nullcontext()
+
+    def __init__(
+        self,
+        directory: Optional[Path] = None,
+        top: int = default_top,
+        sample_interval: Optional[float] = None,
+        log: Optional[logging.Logger] = None,
+    ):
+        self._directory = directory
+        self._top = top
+        self._sample_interval = sample_interval
+        self._log = log or logging.getLogger("data")
+        # the cProfile of each open stage, outermost first
+        self._profiles: list[cProfile.Profile] = []
+        # the inner stages of each open stage
+        self._inner: list[list[pstats.Stats]] = []
+        self._sampler: Optional[_Sampler] = None
+
+    @property
+    def enabled(self) -> bool:
+        """Whether the profiler records anything."""
+        return self._directory is not None
+
+    def stage(self, election_code: str, name: str) -> ContextManager:
+        """Profile the code run while the context is open."""
+        if not self.enabled:
+            return self._disabled_stage
+        path = self._directory / election_code / slugify(name, delim="-")
+        if self._sample_interval:
+            # only keep the part of each stack from the code that opened the stage
+            return self._sample_stage(path, _depth(sys._getframe(1)))
+        return self._profile_stage(path)
+
+    @contextmanager
+    def _profile_stage(self, path: Path) -> Iterator[None]:
+        # only one cProfile can be active, so the enclosing stage is paused,
+        # and the inner stage is added to it when it ends
+        if self._profiles:
+            self._profiles[-1].disable()
+        profile = cProfile.Profile()
+        self._profiles.append(profile)
+        self._inner.append([])
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            self._profiles.pop()
+            inner = self._inner.pop()
+
+            stats = pstats.Stats(profile)
+            for i in inner:
+                stats.add(i)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            stats.dump_stats(path.with_suffix(self.pstats_suffix))
+            self._log_stats(path, stats)
+
+            if self._profiles:
+                self._inner[-1].append(stats)
+                self._profiles[-1].enable()
+
+    @contextmanager
+    def _sample_stage(self, path: Path, depth: int) -> Iterator[None]:
+        if self._sampler is None:
+            self._sampler = _Sampler(threading.get_ident(), self._sample_interval)
+            self._sampler.start()
+        samples = self._sampler.open(depth)
+        try:
+            yield
+        finally:
+            self._sampler.close(samples)
+            if not self._sampler.is_open():
+                self._sampler.stop()
+                self._sampler = None
+
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(
+                path.with_suffix(self.folded_suffix), "wt", encoding="utf-8"
+            ) as f:
+                for stack, count in sorted(samples.items()):
+                    f.write(f"{';'.join(stack)} {count}\n")
+            self._log_samples(path, samples)
+
+    def _log_stats(self, path: Path, stats: pstats.Stats) -> None:
+        stream = io.StringIO()
+        stats.stream = stream
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self._top)
+        self._log.info(f"Profile {path.with_suffix(self.pstats_suffix)}:")
+        # the lines before the table only repeat the file names
+        lines = stream.getvalue().splitlines()
+        start = next((i for i, line in enumerate(lines) if "ncalls" in line), 0)
+        for line in lines[start:]:
+            if line.strip():
+                self._log.info(f"  {line}")
+
+    def _log_samples(self, path: Path, samples: Counter) -> None:
+        total = sum(samples.values())
+        functions = Counter()
+        for stack, count in samples.items():
+            for name in set(stack):
+                functions[name] += count
+        self._log.info(
+            f"Samples {path.with_suffix(self.folded_suffix)}: {total} samples "
+            f"every {self._sample_interval * 1000:.1f} ms."
+        )
+        for name, count in functions.most_common(self._top):
+            self._log.info(f"  {count:>8} {count / total:>6.1%}  {name}")
+
+
+class _Sampler(threading.Thread):
+    """Sample the stack of one thread at a fixed interval,
+    adding each stack to the counters of the open stages."""
+
+    def __init__(self, thread_id: int, interval: float):
+        super().__init__(name="profiler-sampler", daemon=True)
+        self._thread_id = thread_id
+        self._interval = interval
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+        # the samples of each open stage, and the depth of the code that opened it
+        self._open: list[tuple[Counter, int]] = []
+
+    def open(self, depth: int) -> Counter:
+        samples = Counter()
+        with self._lock:
+            self._open.append((samples, depth))
+        return samples
+
+    def close(self, samples: Counter) -> None:
+        with self._lock:
+            # counters with the same samples are equal, so find this one by identity
+            self._open = [i for i in self._open if i[0] is not samples]
+
+    def is_open(self) -> bool:
+        with self._lock:
+            return bool(self._open)
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self._interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is None:
+                continue
+            stack = _stack(frame)
+            with self._lock:
+                for samples, depth in self._open:
+                    samples[stack[depth - 1 :]] += 1
+
+
+def _stack(frame: Optional[FrameType]) -> tuple[str, ...]:
+    """Get the functions in a stack, outermost first."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(
+            f"{Path(code.co_filename).name}:{code.co_firstlineno}({code.co_name})"
+        )
+        frame = frame.f_back
+    names.reverse()
+    return tuple(names)
+
+
+def _depth(frame: Optional[FrameType]) -> int:
+    """Get the number of frames in a stack."""
+    depth = 0
+    while frame is not None:
+        depth += 1
+        frame = frame.f_back
+    return depth
@@ -0,0 +1,138 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Optional
+
+from src.helper.model_json import JsonRecord
+
+
+class ReadyManifest:
+    """The hash, size and item counts of each ready file.
+
+    Used to leave ready files alone when their content has not changed,
+    and gives the web app a value to use as an ETag or to bust caches.
+    """
+
+    file_name = "manifest.json"
+
+    _block_size = 1024 * 1024
+
+    def __init__(self, directory: Path):
+        self._directory = directory
+        self._path = directory / self.file_name
+        self._entries = self._read()
+        self._changed = False
+
+    @property
+    def path(self) -> Path:
+        """The manifest file."""
+        return self._path
+
+    def get(self, name: str) -> Optional[dict]:
+        """Get the entry for a ready file."""
+        return self._entries.get(name)
+
+    def is_unchanged(self, name: str, record: JsonRecord) -> bool:
+        """Check whether a ready file already has the content that was written.
+        The manifest must have the same hash and size,
+        and the file must still have that hash, so a file changed by hand is replaced."""
+        entry = self._entries.get(name)
+        if not entry or entry.get("sha256") != record.sha256:
+            return False
+        if entry.get("size") != record.size:
+            return False
+        return self._on_disk(name, record.sha256, record.size)
+
+    def is_current_copy(self, name: str, source: str, level: int) -> bool:
+        """Check whether a compressed copy of a ready file was made
+        from the content the ready file has now, with the same level,
+        and still has the content that was written."""
+        entry = self._entries.get(name)
+        source_entry = self._entries.get(source)
+        if not entry or not source_entry:
+            return False
+        if entry.get("source") != source_entry.get("sha256"):
+            return False
+        if entry.get("level") != level:
+            return False
+        return self._on_disk(name, entry.get("sha256"), entry.get("size"))
+
+    def update(self, name: str, record: JsonRecord) -> None:
+        """Record the content of a ready file."""
+        entry = {"sha256": record.sha256, "size": record.size, "counts": record.counts}
+        if self._entries.get(name) != entry:
+            self._entries[name] = entry
+            self._changed = True
+
+    def update_copy(
+        self, name: str, source: str, level: int, sha256: str, size: int
+    ) -> None:
+        """Record a compressed copy of a ready file,
+        with the hash of the ready file it was made from and the level."""
+        entry = {
+            "level": level,
+            "sha256": sha256,
+            "size": size,
+            "source": self._entries[source]["sha256"],
+        }
+        if self._entries.get(name) != entry:
+            self._entries[name] = entry
+            self._changed = True
+
+    def retain(self, names: set[str]) -> None:
+        """Remove the entries for files that are no longer written.
+        The files are also removed, such as the compact, ndjson, bundle
+        and compressed files when their option is not given,
+        so they never get out of date.
+        Directories left empty are removed too."""
+        for name in set(self._entries) - names:
+            path = self._directory / name
+            path.unlink(missing_ok=True)
+            self._remove_empty_parents(path)
+            del self._entries[name]
+            self._changed = True
+
+    def save(self) -> bool:
+        """Write the manifest if it has changed."""
+        if not self._changed and self._path.exists():
+            return False
+        temp = self._path.with_suffix(".tmp")
+        with open(temp, "wt", encoding="utf-8") as f:
+            json.dump({"files": self._entries}, f, indent=2, sort_keys=True)
+            f.write("\n")
+        os.replace(temp, self._path)
+        self._changed = False
+        return True
+
+    def _remove_empty_parents(self, path: Path) -> None:
+        parent = path.parent
+        while parent != self._directory and parent.is_dir():
+            if any(parent.iterdir()):
+                break
+            parent.rmdir()
+            parent = parent.parent
+
+    def _on_disk(self, name: str, sha256: str, size: int) -> bool:
+        path = self._directory / name
+        if not path.is_file() or path.stat().st_size != size:
+            return False
+        return self._file_digest(path) == sha256
+
+    def _file_digest(self, path: Path) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            while block := f.read(self._block_size):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _read(self) -> dict[str, dict]:
+        if not self._path.exists():
+            return {}
+        try:
+            with open(self._path, "rt", encoding="utf-8") as f:
+                content = json.load(f)
+        except (OSError, ValueError):
+            # a damaged manifest is replaced
+            return {}
+        return dict(content.get("files", {})) if isinstance(content, dict) else {}
@@ -0,0 +1,156 @@
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import ContextManager, Iterator
+
+
+class Report:
+    """Record the wall time, CPU time and peak memory of each stage of a build,
+    and count what happened.
+
+    Stages with the same name are added together, and stages can be nested.
+    A report that is not enabled does nothing,
+    so the stages and counts can be left in the code.
+    The report is given to the code it records through General.
+    """
+
+    file_name = "build-report.json"
+
+    _disabled_stage = nullcontext()
+
+    def __init__(self, enabled: bool = False, trace_memory: bool = True):
+        self._enabled = enabled
+        self._trace_memory = enabled and trace_memory
+        self._started_tracing = False
+        self._stages: dict[str, dict] = {}
+        self._counts: dict[str, int] = {}
+        # the peak memory seen so far by each open stage
+        self._peaks: list[int] = []
+
+    def start(self) -> None:
+        """Start tracing memory, if this report traces memory
+        and memory is not already being traced."""
+        if self._trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    @property
+    def enabled(self) -> bool:
+        """Whether the report records anything."""
+        return self._enabled
+
+    @property
+    def traces_memory(self) -> bool:
+        """Whether the report records the peak memory of each stage."""
+        return self._trace_memory
+
+    def stage(self, name: str) -> ContextManager:
+        """Record the time and memory used while the context is open."""
+        if not self._enabled:
+            return self._disabled_stage
+        return self._record_stage(name)
+
+    def count(self, name: str, amount: int = 1) -> None:
+        """Add to a counter."""
+        if not self._enabled:
+            return
+        self._counts[name] = self._counts.get(name, 0) + amount
+
+    def stop(self) -> None:
+        """Stop tracing memory, if this report started it."""
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def take(self) -> dict:
+        """Get the recorded stages and counts, and start again.
+        Used to collect the report from a worker process."""
+        result = self.to_dict()
+        self._stages = {}
+        self._counts = {}
+        return result
+
+    def add(self, data: dict) -> None:
+        """Add the stages and counts from another report."""
+        if not self._enabled:
+            return
+        for name, values in data.get("stages", {}).items():
+            stage = self._stages.setdefault(name, _empty_stage())
+            stage["calls"] += values["calls"]
+            stage["wallSeconds"] += values["wallSeconds"]
+            stage["cpuSeconds"] += values["cpuSeconds"]
+            stage["peakBytes"] = max(stage["peakBytes"], values["peakBytes"])
+        for name, value in data.get("counts", {}).items():
+            self.count(name, value)
+
+    def to_dict(self) -> dict:
+        """Get the recorded stages and counts."""
+        return {
+            "memoryTraced": self._trace_memory,
+            "stages": {k: dict(v) for k, v in self._stages.items()},
+            "counts": dict(sorted(self._counts.items())),
+        }
+
+    def write(self, path: Path) -> None:
+        """Write the report as json."""
+        temp = path.with_name(path.name + ".tmp")
+        with open(temp, "wt", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+            f.write("\n")
+        temp.replace(path)
+
+    def summary(self) -> list[str]:
+        """Describe the stages and counts, one line for each."""
+        lines = [
+            f"{'stage':<48} {'calls':>6} {'wall s':>8} {'cpu s':>8} {'peak MB':>8}"
+        ]
+        for name, stage in self._stages.items():
+            peak = (
+                f"{stage['peakBytes'] / 1024 / 1024:>8.1f}"
+                if self._trace_memory
+                else f"{'-':>8}"
+            )
+            lines.append(
+                f"{name:<48} {stage['calls']:>6} {stage['wallSeconds']:>8.3f} "
+                f"{stage['cpuSeconds']:>8.3f} {peak}"
+            )
+        for name, value in sorted(self._counts.items()):
+            lines.append(f"{name:<48} {value:>6}")
+        return lines
+
+    @contextmanager
+    def _record_stage(self, name: str) -> Iterator[None]:
+        tracing = self._trace_memory and tracemalloc.is_tracing()
+        if tracing:
+            # keep the peak of the enclosing stage before starting a new peak
+            if self._peaks:
+                self._peaks[-1] = max(
+                    self._peaks[-1], tracemalloc.get_traced_memory()[1]
+                )
+            tracemalloc.reset_peak()
+            self._peaks.append(0)
+
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall
+            cpu = time.process_time() - cpu
+            peak = 0
+            if tracing:
+                peak = max(self._peaks.pop(), tracemalloc.get_traced_memory()[1])
+                if self._peaks:
+                    self._peaks[-1] = max(self._peaks[-1], peak)
+
+            stage = self._stages.setdefault(name, _empty_stage())
+            stage["calls"] += 1
+            stage["wallSeconds"] += wall
+            stage["cpuSeconds"] += cpu
+            stage["peakBytes"] = max(stage["peakBytes"], peak)
+
+
+def _empty_stage() -> dict:
+    return {"calls": 0, "wallSeconds": 0.0, "cpuSeconds": 0.0, "peakBytes": 0}
@@ -0,0 +1,118 @@
+import argparse
+import heapq
+import json
+from pathlib import Path
+from typing import Any, Mapping, Optional
+
+from src.helper.model_json import ModelJson
+
+
+class Shards:
+    """Split the election directories between several machines,
+    and store the elections built by one machine in a shard file.
+
+    The directories are balanced by their size, not their number,
+    by giving each directory, largest first, to the shard with the least size.
+    The shard file is json, so it can be read on any machine::
+
+        {
+          "format": "vote-plan-shard",
+          "version": 1,
+          "index": 1,
+          "count": 3,
+          "elections": [{"directory": "...", "combination": {...}}, ...]
+        }
+    """
+
+    format_name = "vote-plan-shard"
+    format_version = 1
+
+    def __init__(self):
+        self._model_json = ModelJson()
+
+    @classmethod
+    def parse(cls, value: str) -> tuple[int, int]:
+        """Read a shard given as 'i/N', where i is from 1 to N.
+        Raises an argparse error, so the message is shown for a command line option."""
+        index, _, count = value.partition("/")
+        try:
+            result = int(index), int(count)
+        except ValueError:
+            raise argparse.ArgumentTypeError(
+                f"Shard must be given as 'i/N', not '{value}'."
+            )
+        if not 1 <= result[0] <= result[1]:
+            raise argparse.ArgumentTypeError(
+                f"Shard '{value}' must be from 1 to the number of shards."
+            )
+        return result
+
+    def file_name(self, index: int, count: int) -> str:
+        """Get the default name of the file for a shard."""
+        return f"shard-{index}-of-{count}.json"
+
+    def assign(self, sizes: Mapping[str, int], count: int) -> list[list[str]]:
+        """Give each name to one of count shards,
+        balancing the total size of each shard.
+        The same sizes always give the same shards.
+        The names in each shard are sorted."""
+        if count < 1:
+            raise ValueError("The number of shards must be at least 1.")
+        shards: list[list[str]] = [[] for _ in range(count)]
+        # the total size and index of each shard, smallest first
+        totals = [(0, i) for i in range(count)]
+        for name in sorted(sizes, key=lambda i: (-sizes[i], i)):
+            total, index = heapq.heappop(totals)
+            shards[index].append(name)
+            heapq.heappush(totals, (total + sizes[name], index))
+        return [sorted(i) for i in shards]
+
+    def dump(
+        self,
+        path: Path,
+        index: int,
+        count: int,
+        elections: list[tuple[str, Optional[Any]]],
+    ) -> None:
+        """Write the objects built from each directory in a shard."""
+        data = {
+            "format": self.format_name,
+            "version": self.format_version,
+            "index": index,
+            "count": count,
+            "elections": [
+                {
+                    "directory": name,
+                    "combination": self._model_json.to_dict(obj) if obj else None,
+                }
+                for name, obj in elections
+            ],
+        }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp = path.with_name(path.name + ".tmp")
+        with open(temp, "wt", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+        temp.replace(path)
+
+    def load(
+        self, path: Path, cls: type
+    ) -> tuple[int, int, list[tuple[str, Optional[Any]]]]:
+        """Read a shard file.
+        Returns the shard index, the number of shards,
+        and the directory name and object for each election."""
+        with open(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("format") != self.format_name:
+            raise ValueError(f"File '{path}' is not a shard.")
+        if data.get("version") != self.format_version:
+            raise ValueError(f"Unknown shard version '{data.get('version')}'.")
+        elections = [
+            (
+                i["directory"],
+                self._model_json.from_dict(cls, i["combination"])
+                if i["combination"]
+                else None,
+            )
+            for i in data["elections"]
+        ]
+        return data["index"], data["count"], elections
@@ -0,0 +1,118 @@
+import gzip
+import hashlib
+import lzma
+import os
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+
+class SidecarStats(NamedTuple):
+    """The result of compressing one file."""
+
+    path: Path
+    size: int
+    gzip_size: int
+    gzip_sha256: str
+    gzip_seconds: float
+    xz_size: int
+    xz_sha256: str
+    xz_seconds: float
+
+
+class Sidecars:
+    """Write compressed copies of files next to them, in background threads.
+
+    Each file gets a '.gz' and a '.xz' copy.
+    The gzip copy does not include a timestamp,
+    so the same content always gives the same bytes.
+    The hash and size of each copy are given in the results,
+    so they can be recorded with the hash of the file and the level.
+    """
+
+    default_level = 6
+    gzip_suffix = ".gz"
+    xz_suffix = ".xz"
+
+    def __init__(self, level: int = default_level, max_workers: Optional[int] = None):
+        if not 1 <= level <= 9:
+            raise ValueError("Compression level must be from 1 to 9.")
+        self._level = level
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="sidecars"
+        )
+        self._futures: list[Future] = []
+
+    @property
+    def level(self) -> int:
+        """The compression level."""
+        return self._level
+
+    def __enter__(self) -> "Sidecars":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=exc_type is not None)
+
+    def paths(self, path: Path) -> list[Path]:
+        """Get the compressed copies of a file."""
+        return [
+            path.with_name(path.name + self.gzip_suffix),
+            path.with_name(path.name + self.xz_suffix),
+        ]
+
+    def submit(self, path: Path) -> None:
+        """Start compressing a file."""
+        self._futures.append(self._executor.submit(self._compress, path))
+
+    def results(self) -> list[SidecarStats]:
+        """Wait for the compression to finish and get the results."""
+        results = [i.result() for i in self._futures]
+        self._futures = []
+        return results
+
+    def summary(self, results: list[SidecarStats]) -> str:
+        """Describe the compression."""
+        size = sum(i.size for i in results)
+        gzip_size = sum(i.gzip_size for i in results)
+        xz_size = sum(i.xz_size for i in results)
+        mb = 1024 * 1024
+        return (
+            f"Compressed {len(results)} ready files (level {self._level}) "
+            f"from {size / mb:.2f} MB to "
+            f"{gzip_size / mb:.2f} MB gzip in "
+            f"{sum(i.gzip_seconds for i in results):.3f}s and "
+            f"{xz_size / mb:.2f} MB xz in "
+            f"{sum(i.xz_seconds for i in results):.3f}s."
+        )
+
+    def _compress(self, path: Path) -> SidecarStats:
+        content = path.read_bytes()
+        gzip_path, xz_path = self.paths(path)
+
+        start = time.perf_counter()
+        gzip_content = gzip.compress(content, compresslevel=self._level, mtime=0)
+        self._write(gzip_path, gzip_content)
+        gzip_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        xz_content = lzma.compress(content, preset=self._level)
+        self._write(xz_path, xz_content)
+        xz_seconds = time.perf_counter() - start
+
+        return SidecarStats(
+            path=path,
+            size=len(content),
+            gzip_size=len(gzip_content),
+            gzip_sha256=hashlib.sha256(gzip_content).hexdigest(),
+            gzip_seconds=gzip_seconds,
+            xz_size=len(xz_content),
+            xz_sha256=hashlib.sha256(xz_content).hexdigest(),
+            xz_seconds=xz_seconds,
+        )
+
+    def _write(self, path: Path, content: bytes) -> None:
+        temp = path.with_name(path.name + ".tmp")
+        temp.write_bytes(content)
+        os.replace(temp, path)
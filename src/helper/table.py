@@ -0,0 +1,296 @@
+from abc import ABC, abstractmethod
+from array import array
+from typing import Any, Callable, Iterable, Iterator, Mapping, Sequence, Union
+
+
+class Table(Sequence):
+    """Rows of delimited text, stored as one array per column.
+
+    Numeric columns are stored in typed arrays,
+    and text columns are dictionary-encoded,
+    so each distinct value is stored once.
+    The rows are available as read-only mappings that give the same text
+    as the original rows, so a Table can be used in place of a list of dicts.
+    """
+
+    def __init__(self, fieldnames: list[str], columns: dict[str, "Column"], size: int):
+        self._fieldnames = fieldnames
+        self._columns = columns
+        self._size = size
+
+    @classmethod
+    def from_rows(cls, fieldnames: Sequence[str], rows: Iterable[dict]) -> "Table":
+        """Build a table from rows that all have the same keys."""
+        fieldnames = list(fieldnames)
+        values: dict[str, list] = {name: [] for name in fieldnames}
+        lists = [values[name] for name in fieldnames]
+        size = 0
+        for row in rows:
+            if len(row) != len(fieldnames):
+                raise ValueError(f"Row {size} does not match the field names.")
+            for name, items in zip(fieldnames, lists):
+                items.append(row[name])
+            size += 1
+
+        columns = {name: Column.build(values.pop(name)) for name in fieldnames}
+        return cls(fieldnames, columns, size)
+
+    @property
+    def fieldnames(self) -> list[str]:
+        """The names of the columns."""
+        return self._fieldnames
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, index: Union[int, slice]):
+        if isinstance(index, slice):
+            return self.take(range(self._size)[index])
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("Table index out of range.")
+        return TableRow(self, index)
+
+    def __iter__(self) -> Iterator["TableRow"]:
+        for index in range(self._size):
+            yield TableRow(self, index)
+
+    def __repr__(self) -> str:
+        kinds = ", ".join(f"{k}: {v.kind}" for k, v in self._columns.items())
+        return f"{self.__class__.__name__}({self._size} rows; {kinds})"
+
+    def column(self, name: str) -> "Column":
+        """Get a column."""
+        return self._columns[name]
+
+    def text(self, name: str, index: int) -> str:
+        """Get the original text of a value."""
+        return self._columns[name].text(index)
+
+    def value(self, name: str, index: int) -> Any:
+        """Get a value as a number if the column is numeric, otherwise as text."""
+        return self._columns[name].value(index)
+
+    def take(self, indexes: Iterable[int]) -> "Table":
+        """Build a table with the rows at the given indexes."""
+        if not isinstance(indexes, (range, list, array)):
+            indexes = list(indexes)
+        columns = {k: v.take(indexes) for k, v in self._columns.items()}
+        return Table(self._fieldnames, columns, len(indexes))
+
+    def where(self, name: str, match: Union[Any, Callable[[Any], bool]]) -> "Table":
+        """Build a table with the rows that have the value in a column,
+        or for which the function returns True for the value in a column."""
+        return self.take(self._columns[name].indexes(match))
+
+    def group_by(self, name: str) -> dict[Any, "Table"]:
+        """Build a table for each distinct value in a column."""
+        groups = self._columns[name].groups()
+        return {k: self.take(v) for k, v in groups.items()}
+
+    def sum(self, name: str) -> Union[int, float]:
+        """Add the values in a numeric column."""
+        return sum(self._columns[name].values)
+
+    def to_rows(self) -> list[dict]:
+        """Build a list of dicts with the original text."""
+        return [dict(row) for row in self]
+
+
+class TableRow(Mapping):
+    """A view of one row in a Table."""
+
+    __slots__ = ("_table", "_index")
+
+    def __init__(self, table: Table, index: int):
+        self._table = table
+        self._index = index
+
+    def __getitem__(self, key: str) -> str:
+        return self._table.column(key).text(self._index)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._table.fieldnames)
+
+    def __len__(self) -> int:
+        return len(self._table.fieldnames)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._table.fieldnames
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({dict(self)!r})"
+
+    def typed(self, key: str) -> Any:
+        """Get a value as a number if the column is numeric, otherwise as text."""
+        return self._table.column(key).value(self._index)
+
+
+class Column(ABC):
+    """The values for one column of a Table."""
+
+    kind = ""
+
+    @classmethod
+    def build(cls, texts: list[str]) -> "Column":
+        """Choose the most compact column that gives back the exact text."""
+        return NumberColumn.build(texts) or CategoryColumn.build(texts)
+
+    @property
+    @abstractmethod
+    def values(self) -> Sequence:
+        """The values, as numbers if the column is numeric, otherwise as text."""
+
+    @abstractmethod
+    def text(self, index: int) -> str:
+        """Get the original text of a value."""
+
+    @abstractmethod
+    def value(self, index: int) -> Any:
+        """Get a value as a number if the column is numeric, otherwise as text."""
+
+    @abstractmethod
+    def take(self, indexes: Sequence[int]) -> "Column":
+        """Build a column with the values at the given indexes."""
+
+    def indexes(self, match: Union[Any, Callable[[Any], bool]]) -> list[int]:
+        """Find the indexes of the values that match."""
+        if callable(match):
+            return [i for i, v in enumerate(self.values) if match(v)]
+        return [i for i, v in enumerate(self.values) if v == match]
+
+    def groups(self) -> dict[Any, list[int]]:
+        """Find the indexes for each distinct value."""
+        result: dict[Any, list[int]] = {}
+        for index, value in enumerate(self.values):
+            result.setdefault(value, []).append(index)
+        return result
+
+
+class NumberColumn(Column):
+    """Numbers in a typed array.
+
+    Whole numbers are stored in an array of integers.
+    A mix of whole and decimal numbers are stored in an array of floats,
+    with a flag for each value that was written as a whole number.
+    """
+
+    kind = "number"
+
+    # the largest whole number that a float holds exactly
+    _max_float_int = 2**53
+
+    def __init__(self, numbers: array, whole: array = None):
+        self._numbers = numbers
+        self._whole = whole
+
+    @classmethod
+    def build(cls, texts: list[str]) -> "NumberColumn":
+        """Build a number column if every text converts to a number and back."""
+        if not texts:
+            return None
+
+        numbers = []
+        whole = []
+        for text in texts:
+            try:
+                number = int(text)
+            except (TypeError, ValueError):
+                try:
+                    number = float(text)
+                except (TypeError, ValueError):
+                    return None
+                if repr(number) != text:
+                    return None
+                whole.append(0)
+            else:
+                if str(number) != text:
+                    return None
+                whole.append(1)
+            numbers.append(number)
+
+        if all(whole):
+            try:
+                return cls(array("q", numbers))
+            except OverflowError:
+                return None
+
+        if any(w and abs(n) > cls._max_float_int for n, w in zip(numbers, whole)):
+            return None
+        return cls(array("d", numbers), array("B", whole))
+
+    @property
+    def values(self) -> Sequence:
+        if self._whole is None:
+            return self._numbers
+        return [self.value(i) for i in range(len(self._numbers))]
+
+    def text(self, index: int) -> str:
+        if self._whole is None:
+            return str(self._numbers[index])
+        number = self._numbers[index]
+        return str(int(number)) if self._whole[index] else repr(number)
+
+    def value(self, index: int) -> Union[int, float]:
+        number = self._numbers[index]
+        if self._whole is not None and self._whole[index]:
+            return int(number)
+        return number
+
+    def take(self, indexes: Sequence[int]) -> "NumberColumn":
+        numbers = array(self._numbers.typecode, [self._numbers[i] for i in indexes])
+        if self._whole is None:
+            return NumberColumn(numbers)
+        return NumberColumn(numbers, array("B", [self._whole[i] for i in indexes]))
+
+
+class CategoryColumn(Column):
+    """Text stored as a list of distinct values and an array of codes."""
+
+    kind = "category"
+
+    def __init__(self, categories: list[str], codes: array):
+        self._categories = categories
+        self._codes = codes
+
+    @classmethod
+    def build(cls, texts: list[str]) -> "CategoryColumn":
+        """Build a category column."""
+        lookup: dict[str, int] = {}
+        codes = array("I", [lookup.setdefault(t, len(lookup)) for t in texts])
+        return cls(list(lookup.keys()), codes)
+
+    @property
+    def categories(self) -> list[str]:
+        """The distinct values."""
+        return self._categories
+
+    @property
+    def values(self) -> Sequence:
+        categories = self._categories
+        return [categories[c] for c in self._codes]
+
+    def text(self, index: int) -> str:
+        return self._categories[self._codes[index]]
+
+    def value(self, index: int) -> str:
+        return self._categories[self._codes[index]]
+
+    def take(self, indexes: Sequence[int]) -> "CategoryColumn":
+        codes = self._codes
+        return CategoryColumn(self._categories, array("I", [codes[i] for i in indexes]))
+
+    def indexes(self, match: Union[Any, Callable[[Any], bool]]) -> list[int]:
+        # compare the codes, so each category is only checked once
+        if callable(match):
+            wanted = {i for i, v in enumerate(self._categories) if match(v)}
+        else:
+            wanted = {i for i, v in enumerate(self._categories) if v == match}
+        return [i for i, c in enumerate(self._codes) if c in wanted]
+
+    def groups(self) -> dict[Any, list[int]]:
+        by_code: dict[int, list[int]] = {}
+        for index, code in enumerate(self._codes):
+            by_code.setdefault(code, []).append(index)
+        return {self._categories[k]: v for k, v in by_code.items()}
@@ -0,0 +1,126 @@
+import re
+import sys
+from types import MappingProxyType
+from typing import Iterator, Mapping, Optional
+from xml.etree.ElementTree import Element
+
+
+class XmlNode(Mapping):
+    """A compact, read-only xml element.
+
+    Tags are interned, and the children are indexed by tag
+    the first time a child is looked up.
+
+    A node can also be used as the mapping with the keys
+    'tag', 'attributes', 'text', 'tail', and 'children'.
+    """
+
+    __slots__ = ("tag", "attributes", "text", "tail", "children", "_index")
+
+    _keys = ("tag", "attributes", "text", "tail", "children")
+    _steps = re.compile(r"{[^}]*}[^/]*|[^/]+")
+    _no_attributes = MappingProxyType({})
+
+    def __init__(
+        self,
+        tag: str,
+        attributes: Mapping[str, str],
+        text: str,
+        tail: str,
+        children: tuple["XmlNode", ...],
+    ):
+        self.tag = tag
+        self.attributes = attributes
+        self.text = text
+        self.tail = tail
+        self.children = children
+        self._index: Optional[dict[str, tuple["XmlNode", ...]]] = None
+
+    @classmethod
+    def from_element(cls, element: Element) -> "XmlNode":
+        """Build a node from an ElementTree element and its children."""
+        return cls(
+            tag=sys.intern(element.tag),
+            attributes=dict(element.attrib) if element.attrib else cls._no_attributes,
+            text=(element.text or "").strip(),
+            tail=(element.tail or "").strip(),
+            children=tuple(cls.from_element(child) for child in element),
+        )
+
+    def __getitem__(self, key: str):
+        if key not in self._keys:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(tag={self.tag!r}, "
+            f"attributes={dict(self.attributes)!r}, "
+            f"children={len(self.children)})"
+        )
+
+    def __getstate__(self):
+        return self.tag, dict(self.attributes), self.text, self.tail, self.children
+
+    def __setstate__(self, state):
+        tag, attributes, text, tail, children = state
+        self.tag = sys.intern(tag)
+        self.attributes = attributes if attributes else self._no_attributes
+        self.text = text
+        self.tail = tail
+        self.children = children
+        self._index = None
+
+    def find(
+        self, path: str, namespaces: Optional[dict[str, str]] = None
+    ) -> Optional["XmlNode"]:
+        """Find the first node that matches the path of child tags."""
+        return next(iter(self.findall(path, namespaces)), None)
+
+    def findall(
+        self, path: str, namespaces: Optional[dict[str, str]] = None
+    ) -> tuple["XmlNode", ...]:
+        """Find all the nodes that match the path of child tags."""
+        nodes: tuple[XmlNode, ...] = (self,)
+        for tag in self.expand(path, namespaces or {}):
+            nodes = tuple(child for node in nodes for child in node.children_by(tag))
+        return nodes
+
+    def findtext(
+        self,
+        path: str,
+        default: Optional[str] = None,
+        namespaces: Optional[dict[str, str]] = None,
+    ) -> Optional[str]:
+        """Find the text of the first node that matches the path of child tags."""
+        node = self.find(path, namespaces)
+        return node.text if node is not None else default
+
+    def children_by(self, tag: str) -> tuple["XmlNode", ...]:
+        """Get the children with a tag."""
+        if self._index is None:
+            index: dict[str, list[XmlNode]] = {}
+            for child in self.children:
+                index.setdefault(child.tag, []).append(child)
+            self._index = {k: tuple(v) for k, v in index.items()}
+        return self._index.get(tag, ())
+
+    @classmethod
+    def expand(cls, path: str, namespaces: dict[str, str]) -> list[str]:
+        """Convert a path into a list of tags with the full namespace."""
+        result = []
+        for step in cls._steps.findall(path):
+            if ":" in step and not step.startswith("{"):
+                prefix, name = step.split(":", 1)
+                if prefix not in namespaces:
+                    raise ValueError(f"Unknown namespace prefix '{prefix}'.")
+                result.append(f"{{{namespaces[prefix]}}}{name}")
+            else:
+                result.append(step)
+        return result
@@ -0,0 +1,151 @@
+import zipfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import BinaryIO, Iterator, NamedTuple, Optional
+from xml.etree import ElementTree
+from xml.etree.ElementTree import Element
+
+from src.helper.xml_node import XmlNode
+
+
+class XmlMatch(NamedTuple):
+    """An element that matched a path, and the elements that contain it."""
+
+    path: str
+    """The path that matched."""
+
+    element: Element
+    """The matching element, including all its children."""
+
+    ancestors: list[Element]
+    """The open elements from the root to the parent of the matching element.
+    These only contain the children that have been read so far,
+    without the children that were already selected."""
+
+    def node(self) -> XmlNode:
+        """Copy the matching element into a compact node."""
+        return XmlNode.from_element(self.element)
+
+
+class XmlStream:
+    """Read selected parts of a xml file, without building the whole tree.
+
+    Paths are relative to the root element,
+    and are made of tags separated by '/'.
+    A tag can use a namespace prefix (e.g. 'mf:Results'),
+    or be '*' to match any tag.
+    """
+
+    _wildcard = "*"
+
+    def __init__(self, path: Path, member: Optional[str] = None):
+        self._path = path
+        self._member = member
+
+    @classmethod
+    def from_file(cls, path: Path) -> "XmlStream":
+        """Read a xml file."""
+        return cls(path)
+
+    @classmethod
+    def from_zip(cls, path: Path, member: str) -> "XmlStream":
+        """Read a xml file in a zip file."""
+        return cls(path, member)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(path={str(self._path)!r}, member={self._member!r})"
+
+    def select(
+        self, *paths: str, namespaces: Optional[dict[str, str]] = None
+    ) -> Iterator[XmlMatch]:
+        """Yield the elements that match any of the paths, in document order.
+
+        Each element is cleared after it has been yielded,
+        so copy anything that is needed later.
+        The elements that contain a selected element are also cleared once they end.
+        Other elements are kept until their parent ends,
+        so they are available as context through the ancestors.
+        Memory use grows with the largest selected element,
+        instead of with the whole file.
+        """
+        selectors = [(path, self.expand(path, namespaces or {})) for path in paths]
+        max_depth = max((len(steps) for _, steps in selectors), default=0) + 1
+
+        with self._open() as raw:
+            # the open elements, from the root
+            stack: list[Element] = []
+            # whether each open element contains a selected element
+            contains_selected: list[bool] = []
+            # the depth and path of the element being selected
+            select_depth: Optional[int] = None
+            select_path: Optional[str] = None
+
+            for event, element in ElementTree.iterparse(raw, events=("start", "end")):
+                if event == "start":
+                    stack.append(element)
+                    contains_selected.append(False)
+                    if select_depth is None and len(stack) <= max_depth:
+                        tags = [i.tag for i in stack[1:]]
+                        select_path = self._match(selectors, tags)
+                        if select_path is not None:
+                            select_depth = len(stack) - 1
+                    continue
+
+                stack.pop()
+                element_contains_selected = contains_selected.pop()
+                depth = len(stack)
+
+                if select_depth is not None:
+                    if depth == select_depth:
+                        yield XmlMatch(select_path, element, list(stack))
+                        select_depth = None
+                        select_path = None
+                        contains_selected = [True] * depth
+                        self._discard(stack, element)
+                    continue
+
+                # the selected elements have already been discarded,
+                # so the rest of the element is no longer needed as context
+                if element_contains_selected:
+                    self._discard(stack, element)
+
+    def expand(self, path: str, namespaces: dict[str, str]) -> list[str]:
+        """Convert a path into a list of tags with the full namespace."""
+        result = []
+        for step in path.strip("/").split("/"):
+            if step == self._wildcard:
+                result.append(step)
+            elif ":" in step:
+                prefix, name = step.split(":", 1)
+                if prefix not in namespaces:
+                    raise ValueError(f"Unknown namespace prefix '{prefix}'.")
+                result.append(f"{{{namespaces[prefix]}}}{name}")
+            elif "" in namespaces:
+                result.append(f"{{{namespaces['']}}}{step}")
+            else:
+                result.append(step)
+        return result
+
+    def _match(self, selectors: list, tags: list[str]) -> Optional[str]:
+        for path, steps in selectors:
+            if len(steps) == len(tags) and self._steps_match(steps, tags):
+                return path
+        return None
+
+    def _steps_match(self, steps: list[str], tags: list[str]) -> bool:
+        return all(s == self._wildcard or s == t for s, t in zip(steps, tags))
+
+    def _discard(self, stack: list[Element], element: Element) -> None:
+        element.clear()
+        if stack:
+            stack[-1].remove(element)
+
+    @contextmanager
+    def _open(self) -> Iterator[BinaryIO]:
+        if self._member is None:
+            with open(self._path, "rb") as f:
+                yield f
+        else:
+            with zipfile.ZipFile(self._path, "r") as z:
+                with z.open(self._member) as f:
+                    yield f
@@ -0,0 +1,86 @@
+import zipfile
+from collections import ChainMap
+from pathlib import Path
+from typing import Any, Callable, Iterator, Mapping
+
+
+class ZipMembers(Mapping):
+    """The files in a zip file, each read the first time it is accessed."""
+
+    def __init__(
+        self,
+        path: Path,
+        names: list[str],
+        reader: Callable[[zipfile.ZipFile, zipfile.ZipInfo], Any],
+    ):
+        self._path = path
+        self._reader = reader
+
+        # the key used to access a file -> the name of the file in the zip
+        self._names = {name: name for name in names}
+        self._loaded: dict[str, Any] = {}
+
+    @property
+    def path(self) -> Path:
+        """The path to the zip file."""
+        return self._path
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._names:
+            raise KeyError(key)
+        if key not in self._loaded:
+            self._loaded[key] = self._load(self._names[key])
+        return self._loaded[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._names)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._names
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(path={str(self._path)!r}, "
+            f"names={list(self._names)!r}, loaded={list(self._loaded)!r})"
+        )
+
+    def rename(self, old_key: str, new_key: str) -> None:
+        """Access a file using a different key."""
+        if new_key in self._names:
+            raise ValueError(f"Key '{new_key}' already exists.")
+        self._names[new_key] = self._names.pop(old_key)
+        if old_key in self._loaded:
+            self._loaded[new_key] = self._loaded.pop(old_key)
+
+    def remove(self, key: str) -> None:
+        """Stop providing access to a file."""
+        del self._names[key]
+        self._loaded.pop(key, None)
+
+    def release(self, key: str) -> None:
+        """Discard the read content of a file.
+        The file will be read again if it is accessed again."""
+        self._loaded.pop(key, None)
+
+    def _load(self, name: str) -> Any:
+        with zipfile.ZipFile(self._path, "r") as f:
+            return self._reader(f, f.getinfo(name))
+
+    @classmethod
+    def overlay(cls, *maps: Mapping) -> ChainMap:
+        """Combine mappings without reading any files.
+        Keys in earlier mappings take precedence."""
+        return ChainMap(*maps)
+
+    @classmethod
+    def release_in(cls, data: Mapping, key: str) -> None:
+        """Discard the read content of a file, if the data supports it."""
+        if isinstance(data, ChainMap):
+            item = next((i for i in data.maps if key in i), None)
+            if item is not None:
+                cls.release_in(item, key)
+        elif isinstance(data, ZipMembers):
+            data.release(key)
@@ -3,6 +3,7 @@ from typing import Collection
 
 from dataclasses_json import dataclass_json, LetterCase
 
+from src.helper.code_collection import CodeCollection
 from src.helper.general import General
 from src.model.note import Note
 
@@ -69,20 +70,15 @@ class Ballot:
         self.notes = Note.normalise(notes)
 
     def add_to(self, collection: list["Ballot"]) -> None:
-        existing = self.find_in(collection, self)
-        if existing:
-            existing.merge_in(self)
-        else:
-            collection.append(self)
+        CodeCollection.add_or_merge(collection, self)
 
     @classmethod
     def normalise(cls, collection: list["Ballot"]) -> list["Ballot"]:
-        result = []
+        result = CodeCollection()
         for item in sorted(collection, key=lambda x: x.code):
             item.add_to(result)
         return result
 
     @classmethod
     def find_in(cls, collection: Collection["Ballot"], item: "Ballot") -> "Ballot":
-        result = next((i for i in collection if i.code == item.code), None)
-        return result
+        return CodeCollection.find_code(collection, item.code)
@@ -3,6 +3,7 @@ from typing import Collection
 
 from dataclasses_json import dataclass_json, LetterCase
 
+from src.helper.code_collection import CodeCollection
 from src.helper.general import General
 from src.model.note import Note
 
@@ -51,15 +52,11 @@ class Candidate:
         self.notes = Note.normalise(notes)
 
     def add_to(self, collection: list["Candidate"]) -> None:
-        existing = self.find_in(collection, self)
-        if existing:
-            existing.merge_in(self)
-        else:
-            collection.append(self)
+        CodeCollection.add_or_merge(collection, self)
 
     @classmethod
     def normalise(cls, collection: list["Candidate"]) -> list["Candidate"]:
-        result = []
+        result = CodeCollection()
         for item in sorted(collection, key=lambda x: x.code):
             item.add_to(result)
         return result
@@ -68,5 +65,4 @@ class Candidate:
     def find_in(
         cls, collection: Collection["Candidate"], item: "Candidate"
     ) -> "Candidate":
-        result = next((i for i in collection if i.code == item.code), None)
-        return result
+        return CodeCollection.find_code(collection, item.code)
@@ -3,6 +3,8 @@ from typing import Type, Union
 
 from dataclasses_json import dataclass_json, LetterCase
 
+from src.helper.code_collection import CodeCollection
+from src.helper.report import Report
 from src.model.assembly import Assembly
 from src.model.ballot import Ballot
 from src.model.candidate import Candidate
@@ -31,6 +33,33 @@ class Combination:
     parties: list[Party]
     results: list[Result]
 
+    def __post_init__(self):
+        # index each collection by code, so adding an item does not scan the list
+        self.assemblies = CodeCollection(self.assemblies)
+        self.ballots = CodeCollection(self.ballots)
+        self.candidates = CodeCollection(self.candidates)
+        self.elections = CodeCollection(self.elections)
+        self.electorates = CodeCollection(self.electorates)
+        self.parties = CodeCollection(self.parties)
+        self.results = CodeCollection(self.results)
+
+    # the collection that is grouped by its own code for each partition field
+    _partition_fields = {
+        "election_code": "elections",
+        "assembly_code": "assemblies",
+        "electorate_code": "electorates",
+    }
+
+    collection_names = (
+        "assemblies",
+        "ballots",
+        "candidates",
+        "elections",
+        "electorates",
+        "parties",
+        "results",
+    )
+
     @classmethod
     def build_empty(cls):
         return Combination(
@@ -43,14 +72,63 @@ class Combination:
             results=[],
         )
 
+    def count_in(self, report: Report) -> None:
+        """Count the items added to and merged into each collection in a report."""
+        for name in self.collection_names:
+            getattr(self, name).report = report
+
     def merge_in(self, other: "Combination") -> None:
-        self.assemblies = Assembly.normalise(self.assemblies + other.assemblies)
-        self.ballots = Ballot.normalise(self.ballots + other.ballots)
-        self.candidates = Candidate.normalise(self.candidates + other.candidates)
-        self.elections = Election.normalise(self.elections + other.elections)
-        self.electorates = Electorate.normalise(self.electorates + other.electorates)
-        self.parties = Party.normalise(self.parties + other.parties)
-        self.results = Result.normalise(self.results + other.results)
+        """Merge another combination into this one.
+        Only the items from the other combination are merged or sorted,
+        so the cost depends on the size of the other combination."""
+        self.assemblies = CodeCollection.merge_sorted(self.assemblies, other.assemblies)
+        self.ballots = CodeCollection.merge_sorted(self.ballots, other.ballots)
+        self.candidates = CodeCollection.merge_sorted(self.candidates, other.candidates)
+        self.elections = CodeCollection.merge_sorted(self.elections, other.elections)
+        self.electorates = CodeCollection.merge_sorted(
+            self.electorates, other.electorates
+        )
+        self.parties = CodeCollection.merge_sorted(self.parties, other.parties)
+        self.results = CodeCollection.merge_sorted(self.results, other.results)
+
+    def index(self, field: str) -> dict[str, dict[str, list]]:
+        """Get the items in each collection grouped by
+        'election_code', 'assembly_code' or 'electorate_code'.
+        Elections, assemblies and electorates are grouped by their own code
+        for their own field.
+        The groups are kept until a collection changes."""
+        own_name = self._partition_fields.get(field)
+        if own_name is None:
+            raise ValueError(f"Cannot partition by '{field}'.")
+
+        result = {}
+        for name in self.collection_names:
+            collection = getattr(self, name)
+            if not isinstance(collection, CodeCollection):
+                collection = CodeCollection(collection)
+                setattr(self, name, collection)
+            result[name] = collection.group_by("code" if name == own_name else field)
+        return result
+
+    @classmethod
+    def partition_key(cls, field: str, name: str, item: CombinationInstances) -> str:
+        """Get the value of 'election_code', 'assembly_code' or 'electorate_code'
+        for an item in the named collection."""
+        if cls._partition_fields.get(field) == name:
+            return item.code
+        return getattr(item, field, "")
+
+    def partition_by(self, field: str) -> dict[str, "Combination"]:
+        """Split the items into a combination for each value of
+        'election_code', 'assembly_code' or 'electorate_code'."""
+        index = self.index(field)
+        values = dict.fromkeys(k for groups in index.values() for k in groups)
+        return {
+            value: Combination(
+                **{name: index[name].get(value, []) for name in self.collection_names}
+            )
+            for value in values
+        }
 
     def any(self):
         lists = [
@@ -3,6 +3,7 @@ from typing import Collection
 
 from dataclasses_json import dataclass_json, LetterCase
 
+from src.helper.code_collection import CodeCollection
 from src.helper.general import General
 from src.model.note import Note
 
@@ -56,15 +57,11 @@ class Election:
         self.notes = Note.normalise(notes)
 
     def add_to(self, collection: list["Election"]) -> None:
-        existing = self.find_in(collection, self)
-        if existing:
-            existing.merge_in(self)
-        else:
-            collection.append(self)
+        CodeCollection.add_or_merge(collection, self)
 
     @classmethod
     def normalise(cls, collection: list["Election"]) -> list["Election"]:
-        result = []
+        result = CodeCollection()
         for item in sorted(collection, key=lambda x: x.code):
             item.add_to(result)
         return result
@@ -73,5 +70,4 @@ class Election:
     def find_in(
         cls, collection: Collection["Election"], item: "Election"
     ) -> "Election":
-        result = next((i for i in collection if i.code == item.code), None)
-        return result
+        return CodeCollection.find_code(collection, item.code)
@@ -3,6 +3,7 @@ from dataclasses import dataclass
 
 from dataclasses_json import dataclass_json, LetterCase
 
+from src.helper.code_collection import CodeCollection
 from src.helper.general import General
 from src.model.note import Note
 
@@ -35,15 +36,11 @@ class Electorate:
         self.candidate_codes = General.merge_list_str(candidate_codes)
 
     def add_to(self, collection: list["Electorate"]) -> None:
-        existing = self.find_in(collection, self)
-        if existing:
-            existing.merge_in(self)
-        else:
-            collection.append(self)
+        CodeCollection.add_or_merge(collection, self)
 
     @classmethod
     def normalise(cls, collection: list["Electorate"]) -> list["Electorate"]:
-        result = []
+        result = CodeCollection()
         for item in sorted(collection, key=lambda x: x.code):
             item.add_to(result)
         return result
@@ -52,5 +49,4 @@ class Electorate:
     def find_in(
         cls, collection: typing.Collection["Electorate"], item: "Electorate"
     ) -> "Electorate":
-        result = next((i for i in collection if i.code == item.code), None)
-        return result
+        return CodeCollection.find_code(collection, item.code)
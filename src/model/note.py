@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from functools import cached_property
 from typing import Collection
 
 from boltons.strutils import slugify
@@ -37,8 +38,10 @@ class Note:
     def get_category_info_url(cls):
         return "raw-url"
 
-    @property
+    @cached_property
     def order_id(self):
+        """The sort key for notes.
+        Calculated once, as the fields of a note do not change."""
         d = "-"
         return d.join(
             [
@@ -48,8 +51,18 @@ class Note:
             ]
         )
 
+    @property
+    def identity(self) -> tuple[str, str, str]:
+        """The fields that make notes the same."""
+        return self.category, self.display, self.content
+
     def copy(self):
-        return Note(display=self.display, content=self.content, category=self.category)
+        result = Note(
+            display=self.display, content=self.content, category=self.category
+        )
+        if "order_id" in self.__dict__:
+            result.order_id = self.order_id
+        return result
 
     def merge_in(self, other: "Note") -> None:
         General.pick_match_not_empty(self.display, other.display)
@@ -66,8 +79,14 @@ class Note:
     @classmethod
     def normalise(cls, collection: list["Note"]) -> list["Note"]:
         result = []
+        seen: dict[tuple[str, str, str], Note] = {}
         for item in sorted(collection, key=lambda x: x.order_id):
-            item.add_to(result)
+            existing = seen.get(item.identity)
+            if existing is None:
+                seen[item.identity] = item
+                result.append(item)
+            else:
+                existing.merge_in(item)
         return result
 
     @classmethod
@@ -254,10 +254,10 @@ class AuAecV1:
         comb = combination
         elec = election
 
-        media_feed.populate(orig, comb, elec)
-        tally_room.populate(orig, comb, elec)
-        abs_pop.populate(orig, comb, elec)
-        candidates.populate(orig, comb, elec)
+        for item in [media_feed, tally_room, abs_pop, candidates]:
+            stage = f"populate {type(item).__name__}"
+            with gen.report.stage(stage), gen.profiler.stage(elec.code, stage):
+                item.populate(orig, comb, elec)
 
 
 # Process(
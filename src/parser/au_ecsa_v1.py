@@ -40,12 +40,21 @@ class AuEcsaV1:
         lc = next((i for i in a if self._assembly_lc in i.code and e in i.code), None)
         ha = next((i for i in a if self._assembly_ha in i.code and e in i.code), None)
 
-        ha_pdf = self._get_ha_pdf(original_data, ha)
-        ha_web = self._get_ha_web(original_data, ha)
-        lc_pdf = self._get_lc_pdf(original_data, lc)
-        lc_web = self._get_lc_web(original_data, lc)
-
-        self._create(ha_pdf + ha_web + lc_pdf + lc_web, party_map, combination)
+        gen = self._general
+        rows = []
+        for name, get_rows, assembly in [
+            ("ha pdf", self._get_ha_pdf, ha),
+            ("ha web", self._get_ha_web, ha),
+            ("lc pdf", self._get_lc_pdf, lc),
+            ("lc web", self._get_lc_web, lc),
+        ]:
+            stage = f"populate {type(self).__name__} {name}"
+            with gen.report.stage(stage), gen.profiler.stage(e, stage):
+                rows.extend(get_rows(original_data, assembly))
+
+        stage = f"populate {type(self).__name__} create"
+        with gen.report.stage(stage), gen.profiler.stage(e, stage):
+            self._create(rows, party_map, combination)
 
     def _get_party_category(self, value: str):
         if value == "grouped":
@@ -1,21 +1,70 @@
+import argparse
+import hashlib
 import importlib.resources
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
 from pathlib import Path
+from typing import Callable, Iterator, Mapping, Optional
 
 from src.format.au_abs_pop_v1 import AuAbsPopV1
+from src.helper.compact_json import CompactJson
+from src.helper.election_artifacts import ElectionArtifacts
 from src.helper.general import General
+from src.helper.member_cache import MemberCache
+from src.helper.model_json import JsonRecord, ModelJson
+from src.helper.ready_manifest import ReadyManifest
+from src.helper.profiler import Profiler
+from src.helper.report import Report
+from src.helper.shards import Shards
+from src.helper.sidecars import Sidecars
+from src.helper.zip_members import ZipMembers
 from src.model.combination import Combination
 from src.model.election import Election
 from src.model.note import Note
+from src.ready_bundles import ReadyBundles
+from src.ready_store import ReadyStore
 from src.store import Store
 
 
 class Process:
-    def __init__(self):
-        self._general = General()
-        self._general.log.info("Starting data init.")
-
-        self.store = Store(self._general)
-
+    default_cache_max_bytes = 512 * 1024 * 1024
+
+    verify_levels = ("none", "hash", "structure", "full")
+    """How the written files are checked: not at all,
+    by the hash of what was written, also by the json structure and item counts,
+    or also by loading all the models."""
+
+    default_verify = "structure"
+
+    raw_skip_dirs = ("shared", "__pycache__")
+    """The directories in the raw directory that are not elections:
+    the data used by all the elections, and the bytecode python writes
+    when the raw package is imported to find its path."""
+
+    def __init__(
+        self,
+        cache_dir: Optional[Path] = None,
+        cache_max_bytes: int = default_cache_max_bytes,
+        use_cache: bool = True,
+        verify: str = default_verify,
+        compress_level: int = 0,
+        compact: bool = False,
+        ndjson: bool = False,
+        bundles: bool = False,
+        jobs: int = 1,
+        incremental: bool = True,
+        shard: Optional[tuple[int, int]] = None,
+        shard_path: Optional[Path] = None,
+        report: bool = False,
+        report_memory: bool = False,
+        profile: bool = False,
+        profile_sample: Optional[float] = None,
+        profile_top: int = Profiler.default_top,
+        general: Optional[General] = None,
+    ):
         with importlib.resources.files("raw") as p:
             self.raw_path = Path(p)
         with importlib.resources.files("ready") as p:
@@ -23,98 +72,448 @@ class Process:
         with importlib.resources.files("src") as p:
             self.src_path = Path(p)
 
-    def run(self) -> None:
-        self._general.log.info("Starting data processing.")
+        if general is None:
+            # profile each parser and format populate, with cProfile or by sampling
+            profile_dir = None
+            if profile or profile_sample:
+                profile_dir = self.raw_path.parent / ".cache" / "profile"
+            general = General(
+                # record the time and memory used by each stage, and count what happened
+                report=Report(
+                    enabled=report or report_memory, trace_memory=report_memory
+                ),
+                profiler=Profiler(profile_dir, profile_top, profile_sample),
+            )
+        self._general = general
+        self._report = general.report
+        self._profiler = general.profiler
+        self._report.start()
+        self._general.log.info("Starting data init.")
+
+        self._profile_options = {
+            "profile": profile,
+            "profile_sample": profile_sample,
+            "profile_top": profile_top,
+        }
 
-        shared_path = self.raw_path / "shared" / "original.zip"
-        shared_data = self.store.read_zip_file_list(shared_path)
+        if use_cache:
+            cache_dir = cache_dir or self.raw_path.parent / ".cache" / "members"
+            cache = MemberCache(cache_dir, cache_max_bytes)
+        else:
+            cache = None
 
-        del shared_data[AuAbsPopV1.excel_name]
-        del shared_data[AuAbsPopV1.fed_electorates_2018_name]
-        shared_data[AuAbsPopV1.fed_electorates_name] = shared_data.pop(
-            AuAbsPopV1.fed_electorates_2021_name
+        # the populated combination for each election, to skip unchanged elections
+        if use_cache and incremental:
+            artifacts_dir = self.raw_path.parent / ".cache" / "elections"
+            self.artifacts: Optional[ElectionArtifacts] = ElectionArtifacts(
+                artifacts_dir
+            )
+        else:
+            self.artifacts = None
+
+        self.store = Store(self._general, cache)
+        self._cache_max_bytes = cache_max_bytes
+        self._model_json = ModelJson()
+
+        if verify not in self.verify_levels:
+            raise ValueError(f"Unknown verify level '{verify}'.")
+        self._verify = verify
+        # zero means the ready files are not compressed
+        self._compress_level = compress_level
+        # also write the compact format for everything and each election
+        self._compact = compact
+        self._compact_json = CompactJson(Combination)
+        # also write newline-delimited json for each election and each type
+        self._ndjson = ndjson
+        # also write a bundle of the joined items for each ballot
+        self._bundles = bundles
+        # the number of processes used to build the elections
+        if jobs < 1:
+            raise ValueError("Jobs must be at least 1.")
+        self._jobs = jobs
+        # only build one of several shards of the elections, as (index, count)
+        self._shard = shard
+        self._shard_path = shard_path
+        self._shards = Shards()
+        self._verify_seconds = 0.0
+        self._verified_files = 0
+
+    @classmethod
+    def add_output_arguments(cls, parser: argparse.ArgumentParser) -> None:
+        """Add the options for writing the ready files and the build report."""
+        parser.add_argument(
+            "--verify",
+            choices=cls.verify_levels,
+            default=cls.default_verify,
+            help="how to check the ready files after they are written: "
+            "by hash, also by json structure and item counts, "
+            "or also by loading all the models (default: %(default)s)",
+        )
+        parser.add_argument(
+            "--compress-level",
+            type=int,
+            choices=range(0, 10),
+            nargs="?",
+            const=Sidecars.default_level,
+            default=0,
+            metavar="{0-9}",
+            help="also write .gz and .xz copies of the ready files at this level "
+            f"(default: not written, or {Sidecars.default_level} if no level is given)",
+        )
+        parser.add_argument(
+            "--compact",
+            action="store_true",
+            help="also write everything and each election in the compact format "
+            "(as .compact.json files)",
         )
-        shared_data[AuAbsPopV1.state_electorates_name] = shared_data.pop(
-            AuAbsPopV1.state_electorates_2020_name
+        parser.add_argument(
+            "--ndjson",
+            action="store_true",
+            help="also write each election and each type as newline-delimited json "
+            "(as .ndjson files)",
+        )
+        parser.add_argument(
+            "--bundles",
+            action="store_true",
+            help="also write a bundle of the electorate, ballot, candidates, parties "
+            "and results for each ballot, and an index for each election "
+            "(in ready/bundles)",
+        )
+        parser.add_argument(
+            "--report",
+            action="store_true",
+            help="record the time and CPU time of each stage "
+            "and count what happened, in build-report.json",
+        )
+        parser.add_argument(
+            "--report-memory",
+            action="store_true",
+            help="also record the peak memory of each stage in the build report, "
+            "which makes the build several times slower",
         )
 
-        c = Combination.build_empty()
+    @classmethod
+    def output_options(cls, args: argparse.Namespace) -> dict:
+        """Get the Process options for writing the ready files and the build report."""
+        return {
+            "verify": args.verify,
+            "compress_level": args.compress_level,
+            "compact": args.compact,
+            "ndjson": args.ndjson,
+            "bundles": args.bundles,
+            "report": args.report,
+            "report_memory": args.report_memory,
+        }
 
-        for current_dir in self.raw_path.iterdir():
-            if not current_dir.is_dir() or current_dir.name == "shared":
-                continue
+    def run(self) -> None:
+        self._general.log.info("Starting data processing.")
 
-            input_path = current_dir / "input.json"
+        if self._shard:
+            self.run_shard(*self._shard)
+        else:
+            c = self.build_all(self._jobs)
+            self.write_ready(c)
+        self.write_report()
 
-            if input_path.exists():
-                self._general.log.debug(f"Read input: {input_path}")
-                input_data = self.store.read_json_file(input_path)
-            else:
-                input_data = {}
-
-            original_path = current_dir / "original.zip"
-            if original_path.exists():
-                self._general.log.debug(f"Read original: {original_path}")
-                original_data = self.store.read_zip_file_list(original_path)
-            else:
-                original_data = {}
-
-            another = self.build({**shared_data, **original_data}, input_data)
-            if another:
-                c.merge_in(another)
+        self._general.log.info("Finished data processing.")
 
+    def run_shard(self, index: int, count: int) -> Path:
+        """Build one shard of the election directories, and write the shard file."""
+        election_dirs = self.shard_dirs(index, count)
+        self._general.log.info(
+            f"Building shard {index} of {count}: "
+            f"{', '.join(i.name for i in election_dirs) or 'no elections'}."
+        )
+        combinations = self.build_elections(election_dirs, self._jobs)
+        path = self._shard_path or (
+            self.raw_path.parent
+            / ".cache"
+            / "shards"
+            / self._shards.file_name(index, count)
+        )
+        self._shards.dump(
+            path,
+            index,
+            count,
+            [(i.name, combinations[i]) for i in election_dirs],
+        )
+        self._general.log.info(f"Wrote shard {index} of {count} to {path}.")
+        for line in self.summaries():
+            self._general.log.info(line)
+        return path
+
+    def shard_dirs(self, index: int, count: int) -> list[Path]:
+        """Get the election directories in a shard,
+        balancing the shards by the size of the files in the directories."""
+        election_dirs = {i.name: i for i in self.election_dirs()}
+        sizes = {
+            name: sum(i.stat().st_size for i in path.rglob("*") if i.is_file())
+            for name, path in election_dirs.items()
+        }
+        names = self._shards.assign(sizes, count)[index - 1]
+        return [election_dirs[i] for i in names]
+
+    def merge_shards(self, paths: list[Path]) -> None:
+        """Combine the shard files from every shard into the ready files."""
+        self._general.log.info(f"Merging {len(paths)} shard files.")
+        counts = set()
+        indexes = set()
+        elections = {}
+        for path in paths:
+            index, count, items = self._shards.load(path, Combination)
+            counts.add(count)
+            if index in indexes:
+                raise ValueError(f"Shard {index} was given more than once.")
+            indexes.add(index)
+            for name, combination in items:
+                if name in elections:
+                    raise ValueError(f"Election '{name}' is in more than one shard.")
+                elections[name] = combination
+
+        if len(counts) != 1:
+            raise ValueError("The shard files are from different numbers of shards.")
+        (count,) = counts
+        missing = sorted(set(range(1, count + 1)) - indexes)
+        if missing:
+            raise ValueError(f"Missing shards {missing} of {count}.")
+
+        # merge in the same order as a build on one machine
+        c = Combination.build_empty()
+        c.count_in(self._report)
+        with self._report.stage("merge"):
+            for name in sorted(elections):
+                if elections[name]:
+                    c.merge_in(elections[name])
+        self.write_ready(c)
+        self.write_report()
+
+        self._general.log.info("Finished merging shards.")
+
+    def write_report(self) -> None:
+        """Write the build report and describe it, if it is enabled."""
+        if not self._report.enabled:
+            return
+        path = self.raw_path.parent / Report.file_name
+        self._report.write(path)
+        self._report.stop()
+        self._general.log.info(f"Build report written to {path}.")
+        for line in self._report.summary():
+            self._general.log.info(line)
+
+    def write_ready(self, c: Combination) -> None:
+        """Write and check the ready files."""
         self._general.log.info(f"Writing ready files.")
 
-        # write everything to a json file
-        all_file = self.ready_path / "all.json"
-        self._write_combination_json(all_file, c)
+        # write everything, each election, and each combination property
+        # to separate json files in one pass
+        self._write_ready_files(c)
 
-        # test reading
-        self._read_combination_json(all_file)
+        self._general.log.info(
+            f"Verified {self._verified_files} ready files ({self._verify}) "
+            f"in {self._verify_seconds:.3f}s."
+        )
+        for line in self.summaries():
+            self._general.log.info(line)
 
-        # write each election to separate json files
-        for election in c.elections:
-            ec = election.code
-            election_file = self.ready_path / election.code
-            election_file = election_file.with_suffix(".json")
-            obj = Combination(
-                assemblies=[i for i in c.assemblies if i.election_code == ec],
-                ballots=[i for i in c.ballots if i.election_code == ec],
-                candidates=[i for i in c.candidates if i.election_code == ec],
-                elections=[election],
-                electorates=[i for i in c.electorates if i.election_code == ec],
-                parties=[i for i in c.parties if i.election_code == ec],
-                results=[i for i in c.results if i.election_code == ec],
+    def build_all(self, jobs: int = 1) -> Combination:
+        """Build the combination for all the elections in the raw directory.
+        The elections are merged in directory order."""
+        election_dirs = self.election_dirs()
+        if self.artifacts:
+            self.artifacts.retain(i.name for i in election_dirs)
+        combinations = self.build_elections(election_dirs, jobs)
+
+        c = Combination.build_empty()
+        c.count_in(self._report)
+        with self._report.stage("merge"):
+            for current_dir in election_dirs:
+                another = combinations[current_dir]
+                if another:
+                    c.merge_in(another)
+        return c
+
+    def build_elections(
+        self, election_dirs: list[Path], jobs: int = 1
+    ) -> dict[Path, Optional[Combination]]:
+        """Build the combination for each election directory.
+        Elections with unchanged inputs are loaded from their artifacts.
+        With more than one job, the other elections are built in a pool of processes."""
+        shared_data = self.read_shared_data()
+
+        fingerprints = {}
+        combinations = {}
+        if self.artifacts:
+            with self._report.stage("fingerprint"):
+                fingerprints = self.fingerprints(election_dirs)
+            with self._report.stage("artifacts load"):
+                for current_dir in election_dirs:
+                    found, value = self.artifacts.load(
+                        current_dir.name, fingerprints[current_dir]
+                    )
+                    if found:
+                        combinations[current_dir] = value
+
+        changed_dirs = [i for i in election_dirs if i not in combinations]
+        if jobs > 1 and len(changed_dirs) > 1:
+            built = self._build_in_pool(changed_dirs, shared_data, jobs)
+        else:
+            built = ((i, self.build_dir(i, shared_data)) for i in changed_dirs)
+
+        # store each artifact as soon as it is built, before it is merged
+        for current_dir, another in built:
+            if self.artifacts:
+                self.artifacts.save(
+                    current_dir.name, fingerprints[current_dir], another
+                )
+            combinations[current_dir] = another
+        return combinations
+
+    def fingerprints(self, election_dirs: list[Path]) -> dict[Path, str]:
+        """Get the fingerprint of the inputs of each election:
+        the input file, the original and shared zip files,
+        and the source of the parsers, the modules they use, and this module."""
+        shared_digest = self.artifacts.zip_digest(
+            self.raw_path / "shared" / "original.zip"
+        )
+        process_digest = self.artifacts.file_digest(Path(__file__))
+        source_digests = {}
+        result = {}
+        for current_dir in election_dirs:
+            input_path = current_dir / "input.json"
+            parser_names = []
+            if input_path.exists():
+                input_data = self.store.read_json_file(input_path) or {}
+                parser_names = sorted(
+                    note.get("content") or ""
+                    for election in input_data.get("elections", [])
+                    for note in election.get("notes") or []
+                    if note.get("category") == Note.get_category_raw_parser()
+                )
+
+            key = tuple(parser_names)
+            if key not in source_digests:
+                modules = [
+                    sys.modules[Combination.__module__],
+                    sys.modules[Store.__module__],
+                ]
+                for name in parser_names:
+                    parser_class = name and self.store.get_parser(
+                        self.src_path / "parser", name
+                    )
+                    if parser_class:
+                        modules.append(sys.modules[parser_class.__module__])
+                source_digests[key] = self.artifacts.source_digest(modules, "src")
+
+            result[current_dir] = self.artifacts.fingerprint(
+                [
+                    self.artifacts.file_digest(input_path),
+                    self.artifacts.zip_digest(current_dir / "original.zip"),
+                    shared_digest,
+                    source_digests[key],
+                    process_digest,
+                ]
             )
-            if obj.any():
-                self._write_combination_json(election_file, obj)
-
-        # write each combination property to separate file
-        sep_files = {
-            "assemblies": c.assemblies,
-            "ballots": c.ballots,
-            "candidates": c.candidates,
-            "elections": c.elections,
-            "electorates": c.electorates,
-            "parties": c.parties,
-            "results": c.results,
+        return result
+
+    def _build_in_pool(
+        self, election_dirs: list[Path], shared_data: ZipMembers, jobs: int
+    ) -> Iterator[tuple[Path, Optional[Combination]]]:
+        """Build elections in a pool of processes, in order.
+        The elections that were built are provided before any error is raised."""
+        # each worker reads the shared files it uses from the zip file, when first used
+        options = {
+            "cache_dir": self.store.cache.directory if self.store.cache else None,
+            "cache_max_bytes": self._cache_max_bytes,
+            "use_cache": self.store.cache is not None,
+            "incremental": False,
+            "report": self._report.enabled,
+            "report_memory": self._report.traces_memory,
+            **self._profile_options,
         }
-        for k, v in sep_files.items():
-            file = self.ready_path / f"{k}.json"
-            obj = Combination(
-                assemblies=v if k == "assemblies" else [],
-                ballots=v if k == "ballots" else [],
-                candidates=v if k == "candidates" else [],
-                elections=v if k == "elections" else [],
-                electorates=v if k == "electorates" else [],
-                parties=v if k == "parties" else [],
-                results=v if k == "results" else [],
-            )
-            self._write_combination_json(file, obj)
+        self._general.log.info(
+            f"Building {len(election_dirs)} elections using {jobs} processes."
+        )
+        error = None
+        summaries = {}
+        with ProcessPoolExecutor(
+            max_workers=min(jobs, len(election_dirs)),
+            initializer=_init_worker,
+            initargs=(options, shared_data.path),
+        ) as executor:
+            futures = [executor.submit(_build_in_worker, i) for i in election_dirs]
+            for current_dir, future in zip(election_dirs, futures):
+                try:
+                    combination, pid, lines, report = future.result()
+                except Exception as e:
+                    error = error or e
+                    continue
+                self._report.add(report)
+                # the summaries from the last election built by a worker cover all its work
+                summaries[pid] = lines
+                yield current_dir, combination
+
+        for pid, lines in sorted(summaries.items()):
+            for line in lines:
+                self._general.log.info(f"Worker {pid}: {line}")
+        if error:
+            raise error
+
+    def read_shared_data(self, shared_path: Optional[Path] = None) -> ZipMembers:
+        """Provide the data used by all the elections."""
+        shared_path = shared_path or self.raw_path / "shared" / "original.zip"
+        shared_data = self.store.read_zip_members(shared_path)
+
+        shared_data.remove(AuAbsPopV1.excel_name)
+        shared_data.remove(AuAbsPopV1.fed_electorates_2018_name)
+        shared_data.rename(
+            AuAbsPopV1.fed_electorates_2021_name, AuAbsPopV1.fed_electorates_name
+        )
+        shared_data.rename(
+            AuAbsPopV1.state_electorates_2020_name, AuAbsPopV1.state_electorates_name
+        )
+        return shared_data
+
+    def election_dirs(self) -> list[Path]:
+        """Get the directory of each election, in the order they are merged.
+        The directories are sorted by name, so every machine uses the same order."""
+        return sorted(
+            i
+            for i in self.raw_path.iterdir()
+            if i.is_dir() and i.name not in self.raw_skip_dirs
+        )
 
-        self._general.log.info("Finished data processing.")
+    def build_dir(self, current_dir: Path, shared_data: Mapping) -> Combination:
+        """Build the combination for the election in a raw directory."""
+        with self._report.stage("build election"):
+            return self._build_dir(current_dir, shared_data)
 
-    def build(self, original_data: dict, input_data: dict) -> Combination:
+    def _build_dir(self, current_dir: Path, shared_data: Mapping) -> Combination:
+        input_path = current_dir / "input.json"
+
+        if input_path.exists():
+            self._general.log.debug(f"Read input: {input_path}")
+            input_data = self.store.read_json_file(input_path)
+        else:
+            input_data = {}
+
+        original_path = current_dir / "original.zip"
+        if original_path.exists():
+            self._general.log.debug(f"Read original: {original_path}")
+            original_data = self.store.read_zip_members(original_path)
+        else:
+            original_data = {}
+
+        return self.build(ZipMembers.overlay(original_data, shared_data), input_data)
+
+    def summaries(self) -> list[str]:
+        """Describe how well the caches worked."""
+        lines = [self.store.cache.summary()] if self.store.cache else []
+        if self.artifacts:
+            lines.append(self.artifacts.summary())
+        lines.append(self._general.codes.summary())
+        return lines
+
+    def build(self, original_data: Mapping, input_data: dict) -> Combination:
         result: Combination = None
 
         # must have both data sources
@@ -122,13 +521,14 @@ class Process:
             return result
 
         combination: Combination = Combination.from_dict(input_data)
+        combination.count_in(self._report)
         for election in combination.elections:
             self.election(original_data, combination, election)
 
         return combination
 
     def election(
-        self, original_data: dict, combination: Combination, election: Election
+        self, original_data: Mapping, combination: Combination, election: Election
     ) -> None:
         """Populate the Combination with election data."""
 
@@ -156,14 +556,317 @@ class Process:
         # run the parser
         self._general.log.info(f"Parsing {election.code} using {parser_name}.")
         parser = parser_class(self._general)
-        parser.populate(original_data, combination, election)
+        stage = f"populate {parser_name}"
+        with self._report.stage(stage), self._profiler.stage(election.code, stage):
+            parser.populate(original_data, combination, election)
 
-    def _write_combination_json(self, path: Path, obj: Combination):
-        with open(path, "wt") as f:
-            f.write(Combination.schema().dumps(obj, sort_keys=True))
+    def _write_ready_files(self, c: Combination):
+        paths = {"all": self.ready_path / "all.json"}
+        election_codes = set()
+        for election in c.elections:
+            election_codes.add(election.code)
+            paths[election.code] = (self.ready_path / election.code).with_suffix(
+                ".json"
+            )
+        for name in Combination.collection_names:
+            paths[name] = self.ready_path / f"{name}.json"
+
+        def route(name: str, item) -> list[str]:
+            code = Combination.partition_key("election_code", name, item)
+            if code in election_codes:
+                return ["all", code, name]
+            return ["all", name]
+
+        # only write the ready files that changed, to temporary files
+        manifest = ReadyManifest(self.ready_path)
+        offsets = {"all": []}
+        with self._report.stage("serialise json"):
+            records, changed = self._write_changed_files(
+                manifest,
+                paths,
+                self._model_json.dump_fan_out,
+                c,
+                route,
+                offsets=offsets,
+            )
+
+        lines_paths = {}
+        if self._ndjson:
+            for election in c.elections:
+                lines_paths[election.code] = self.ready_path / f"{election.code}.ndjson"
+            for name in Combination.collection_names:
+                lines_paths[name] = self.ready_path / f"{name}.ndjson"
+
+            def lines_route(name: str, item) -> list[str]:
+                code = Combination.partition_key("election_code", name, item)
+                return [code, name] if code in election_codes else [name]
+
+            with self._report.stage("serialise ndjson"):
+                lines_records, lines_changed = self._write_changed_files(
+                    manifest,
+                    lines_paths,
+                    self._model_json.dump_lines_fan_out,
+                    c,
+                    lines_route,
+                )
+
+        unchanged = 0
+        # the compressed copies of the ready files
+        copies: set[Path] = set()
+        with ExitStack() as stack:
+            sidecars = None
+            if self._compress_level:
+                sidecars = stack.enter_context(Sidecars(self._compress_level))
+
+            with self._report.stage("write json"):
+                for key, path in paths.items():
+                    if key in changed:
+                        self._replace_with_temp(manifest, path, records[key], True)
+                    else:
+                        unchanged += 1
+                    # compress in the background while the other files are checked
+                    if sidecars:
+                        self._compress_if_changed(sidecars, manifest, path, copies)
+
+            with self._report.stage("write ndjson"):
+                for key, path in lines_paths.items():
+                    if key in lines_changed:
+                        self._replace_with_temp(
+                            manifest, path, lines_records[key], False
+                        )
+                    else:
+                        unchanged += 1
+                    if sidecars:
+                        self._compress_if_changed(sidecars, manifest, path, copies)
+
+            written = set(paths.values()) | set(lines_paths.values())
+
+            # the offset of each item in the all file, for random access
+            index_path = ReadyStore.index_path(paths["all"])
+            with self._report.stage("write index"):
+                index = ReadyStore.build_index(
+                    paths["all"], records["all"], offsets["all"]
+                )
+                written.add(index_path)
+                if not self._write_if_changed(
+                    manifest, index_path, index, records["all"].counts
+                ):
+                    unchanged += 1
+
+            if self._compact:
+                with self._report.stage("write compact"):
+                    for path, obj in self._compact_objects(c, paths, election_codes):
+                        written.add(path)
+                        if not self._write_compact_json(manifest, path, obj):
+                            unchanged += 1
+                        if sidecars:
+                            self._compress_if_changed(sidecars, manifest, path, copies)
+
+            if self._bundles:
+                bundles_path = self.ready_path / ReadyBundles.directory_name
+                with self._report.stage("write bundles"):
+                    for bundle in ReadyBundles().build(c):
+                        path = bundles_path / bundle.name
+                        path.parent.mkdir(parents=True, exist_ok=True)
+                        written.add(path)
+                        if not self._write_if_changed(
+                            manifest, path, bundle.content, bundle.counts
+                        ):
+                            unchanged += 1
+
+            if sidecars:
+                with self._report.stage("compress"):
+                    results = sidecars.results()
+                for result in results:
+                    source = self._ready_name(result.path)
+                    gzip_path, xz_path = sidecars.paths(result.path)
+                    manifest.update_copy(
+                        self._ready_name(gzip_path),
+                        source,
+                        sidecars.level,
+                        result.gzip_sha256,
+                        result.gzip_size,
+                    )
+                    manifest.update_copy(
+                        self._ready_name(xz_path),
+                        source,
+                        sidecars.level,
+                        result.xz_sha256,
+                        result.xz_size,
+                    )
+                self._general.log.info(sidecars.summary(results))
+
+            manifest.retain({self._ready_name(i) for i in written | copies})
+            manifest.save()
+            self._report.count("ready files written", len(written) - unchanged)
+            self._report.count("ready files unchanged", unchanged)
+            self._general.log.info(
+                f"Wrote {len(written) - unchanged} ready files, "
+                f"{unchanged} were unchanged."
+            )
+
+    def _write_changed_files(
+        self,
+        manifest: ReadyManifest,
+        paths: dict[str, Path],
+        dump,
+        obj: Combination,
+        route,
+        **kwargs,
+    ) -> tuple[dict[str, JsonRecord], set[str]]:
+        """Write the files that changed to a temporary file next to each path,
+        using a fan out dump method.
+
+        The content is only hashed first, and compared with the manifest,
+        so nothing is written when no file has changed.
+        When the manifest has none of the files, they are written in one pass.
+        Any keyword arguments are given to the first dump.
+        Returns what is in each file, and the keys of the files that were written."""
+        if not any(manifest.get(self._ready_name(i)) for i in paths.values()):
+            return self._write_temp_files(paths, dump, obj, route, **kwargs), set(paths)
+
+        records = dump(obj, dict.fromkeys(paths), route, **kwargs)
+        changed = {
+            k: v
+            for k, v in paths.items()
+            if not manifest.is_unchanged(self._ready_name(v), records[k])
+        }
+        if changed:
+            self._write_temp_files(changed, dump, obj, route)
+        return records, set(changed)
+
+    def _compress_if_changed(
+        self,
+        sidecars: Sidecars,
+        manifest: ReadyManifest,
+        path: Path,
+        copies: set[Path],
+    ) -> None:
+        """Start compressing a ready file, unless its compressed copies
+        were made from the same content with the same level."""
+        paths = sidecars.paths(path)
+        copies.update(paths)
+        source = self._ready_name(path)
+        if not all(
+            manifest.is_current_copy(self._ready_name(i), source, sidecars.level)
+            for i in paths
+        ):
+            sidecars.submit(path)
+
+    def _write_temp_files(
+        self, paths: dict[str, Path], dump, obj: Combination, route, **kwargs
+    ) -> dict[str, JsonRecord]:
+        """Write to a temporary file next to each path, using a fan out dump method.
+        Any keyword arguments are given to the dump method.
+        Newlines are not translated, so the bytes match the hash of what was written."""
+        with ExitStack() as stack:
+            files = {
+                k: stack.enter_context(
+                    open(self._temp_path(v), "wt", encoding="utf-8", newline="")
+                )
+                for k, v in paths.items()
+            }
+            return dump(obj, files, route, **kwargs)
+
+    def _replace_with_temp(
+        self, manifest: ReadyManifest, path: Path, record: JsonRecord, is_object: bool
+    ) -> None:
+        """Check the temporary file of a ready file, then replace the ready file.
+        Files that are not one json object are only checked by hash."""
+        temp_path = self._temp_path(path)
+        with self._report.stage("verify"):
+            self._verify_combination_json(temp_path, record, is_object)
+        os.replace(temp_path, path)
+        manifest.update(self._ready_name(path), record)
+
+    def _temp_path(self, path: Path) -> Path:
+        return path.with_name(path.name + ".tmp")
+
+    def _ready_name(self, path: Path) -> str:
+        """Get the name of a ready file in the manifest."""
+        return path.relative_to(self.ready_path).as_posix()
+
+    def _compact_objects(
+        self, c: Combination, paths: dict[str, Path], election_codes: set[str]
+    ):
+        """Get the compact file path and combination for everything and each election."""
+        yield paths["all"].with_suffix(".compact.json"), c
+        partitions = c.partition_by("election_code")
+        for code in sorted(election_codes):
+            yield paths[code].with_suffix(".compact.json"), partitions[code]
+
+    def _write_compact_json(
+        self, manifest: ReadyManifest, path: Path, obj: Combination
+    ) -> bool:
+        """Write a combination in the compact format, if it has changed."""
+        content = self._compact_json.dumps(obj).encode("utf-8")
+        counts = {k: len(getattr(obj, k)) for k in Combination.collection_names}
+        return self._write_if_changed(
+            manifest,
+            path,
+            content,
+            counts,
+            lambda p, r: self._verify_combination_json(p, r, compact=True),
+        )
+
+    def _write_if_changed(
+        self,
+        manifest: ReadyManifest,
+        path: Path,
+        content: bytes,
+        counts: dict[str, int],
+        verify: Optional[Callable[[Path, JsonRecord], None]] = None,
+    ) -> bool:
+        """Write content to a ready file, if it has changed.
+        The written file is checked with the verify function, if one is given."""
+        record = JsonRecord(
+            sha256=hashlib.sha256(content).hexdigest(),
+            size=len(content),
+            counts=counts,
+        )
+        if manifest.is_unchanged(self._ready_name(path), record):
+            return False
+
+        temp_path = self._temp_path(path)
+        temp_path.write_bytes(content)
+        if verify:
+            with self._report.stage("verify"):
+                verify(temp_path, record)
+        os.replace(temp_path, path)
+        manifest.update(self._ready_name(path), record)
+        return True
+
+    def _verify_combination_json(
+        self,
+        path: Path,
+        record: JsonRecord,
+        is_object: bool = True,
+        compact: bool = False,
+    ):
+        """Check a written file, which can be in the compact format.
+        Each verify level also does the checks of the levels before it."""
+        level = self.verify_levels.index(self._verify)
+        if level == 0:
+            return
+        if not is_object:
+            level = 1
+
+        start = time.perf_counter()
+        self._model_json.check_hash(path, record)
+        if level >= 2 and compact:
+            self._compact_json.check_structure(path, record.counts)
+        elif level >= 2:
+            self._model_json.check_structure(path, Combination, record)
+        if level >= 3 and compact:
+            with open(path, "rt", encoding="utf-8") as f:
+                self._compact_json.load(f)
+        elif level >= 3:
+            self._read_combination_json(path)
+        self._verify_seconds += time.perf_counter() - start
+        self._verified_files += 1
 
     def _read_combination_json(self, path: Path):
-        with open(path, "rt") as f:
+        with open(path, "rt", encoding="utf-8") as f:
             Combination.schema().loads(f.read())
 
 
@@ -171,3 +874,22 @@ if __name__ == "__main__":
 
     def main():
         Process().run()
+
+
+# the process and shared data used by each worker process
+_worker: Optional[Process] = None
+_worker_shared: Mapping = {}
+
+
+def _init_worker(options: dict, shared_path: Path) -> None:
+    global _worker, _worker_shared
+    _worker = Process(**options)
+    _worker_shared = _worker.read_shared_data(shared_path)
+
+
+def _build_in_worker(
+    current_dir: Path,
+) -> tuple[Optional[Combination], int, list[str], dict]:
+    combination = _worker.build_dir(current_dir, _worker_shared)
+    report = _worker._report.take()
+    return combination, os.getpid(), _worker.summaries(), report
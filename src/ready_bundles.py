@@ -0,0 +1,158 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, NamedTuple, Optional
+
+from src.helper.model_json import ModelJson
+from src.model.combination import Combination
+from src.model.electorate import Electorate
+
+
+class Bundle(NamedTuple):
+    """One file of the bundles for an election."""
+
+    name: str
+    """The path of the file, relative to the bundles directory."""
+
+    content: bytes
+    """The json text, encoded as utf-8."""
+
+    counts: dict[str, int]
+    """The number of items in each list of the file."""
+
+
+class ReadyBundles:
+    """Join the items needed to show one ballot into one small json file.
+
+    Each bundle has the electorate, the ballot, the candidates on the ballot,
+    the parties of those candidates, and the results for the ballot
+    and for the electorate.
+    An electorate without any ballots gets one bundle named by the electorate code.
+    Each election also gets an index of its bundles.
+
+    The bundles are built from the code indexes of each election,
+    with the elections built in separate processes when there is more than one CPU.
+    """
+
+    directory_name = "bundles"
+    index_name = "index.json"
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self._max_workers = max_workers
+
+    def build(self, c: Combination) -> Iterator[Bundle]:
+        """Build the bundles and index for each election, in the order of the elections."""
+        codes = [i.code for i in c.elections]
+        partitions = c.partition_by("election_code")
+        elections = [partitions[i] for i in codes if i in partitions]
+        if not elections:
+            return
+        workers = min(self._max_workers or os.cpu_count() or 1, len(elections))
+        if workers == 1:
+            for election in elections:
+                yield from _build_election(election)
+            return
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # start the largest elections first, so they do not finish last
+            futures = {}
+            for election in sorted(elections, key=_size, reverse=True):
+                futures[id(election)] = executor.submit(_build_election, election)
+            for election in elections:
+                yield from futures[id(election)].result()
+
+
+def _build_election(c: Combination) -> list[Bundle]:
+    """Build the bundles and the index for the combination of one election."""
+    model_json = ModelJson()
+    (election,) = c.elections
+    ballots = c.ballots
+    parties = c.parties
+    ballots_by_electorate = ballots.group_by("electorate_code")
+    candidates_by_electorate = c.candidates.group_by("electorate_code")
+    candidates_by_ballot = c.candidates.group_by("ballot_code")
+    results_by_electorate = c.results.group_by("electorate_code")
+    results_by_ballot = c.results.group_by("ballot_code")
+
+    bundles = []
+    entries = []
+    for electorate in c.electorates:
+        # the ballots given by the ballots, the electorate and the candidates
+        ballot_codes = dict.fromkeys(
+            [i.code for i in ballots_by_electorate.get(electorate.code, [])]
+            + list(electorate.ballot_codes or [])
+            + [
+                i.ballot_code
+                for i in candidates_by_electorate.get(electorate.code, [])
+                if i.ballot_code
+            ]
+        )
+        electorate_results = [
+            i
+            for i in results_by_electorate.get(electorate.code, [])
+            if not i.ballot_code
+        ]
+        for ballot_code in ballot_codes or [None]:
+            if ballot_code:
+                candidates = candidates_by_ballot.get(ballot_code, [])
+                results = electorate_results + results_by_ballot.get(ballot_code, [])
+            else:
+                candidates = candidates_by_electorate.get(electorate.code, [])
+                results = electorate_results
+            party_codes = dict.fromkeys(
+                i.party_code for i in candidates if i.party_code
+            )
+            bundle_parties = [
+                party
+                for party in (parties.find(i) for i in party_codes)
+                if party is not None
+            ]
+            ballot = ballots.find(ballot_code) if ballot_code else None
+
+            data = {
+                "ballot": model_json.to_dict(ballot) if ballot else None,
+                "ballotCode": ballot_code,
+                "candidates": [model_json.to_dict(i) for i in candidates],
+                "electionCode": election.code,
+                "electorate": model_json.to_dict(electorate),
+                "parties": [model_json.to_dict(i) for i in bundle_parties],
+                "results": [model_json.to_dict(i) for i in results],
+            }
+            counts = {
+                "candidates": len(candidates),
+                "parties": len(bundle_parties),
+                "results": len(results),
+            }
+            file_name = f"{ballot_code or electorate.code}.json"
+            content = json.dumps(data).encode("utf-8")
+            bundles.append(Bundle(f"{election.code}/{file_name}", content, counts))
+            entries.append(_index_entry(file_name, electorate, ballot_code, content))
+
+    entries.sort(key=lambda i: i["file"])
+    index = {"bundles": entries, "electionCode": election.code}
+    bundles.append(
+        Bundle(
+            f"{election.code}/{ReadyBundles.index_name}",
+            json.dumps(index, indent=2).encode("utf-8"),
+            {"bundles": len(entries)},
+        )
+    )
+    return bundles
+
+
+def _index_entry(
+    file_name: str, electorate: Electorate, ballot_code: Optional[str], content: bytes
+) -> dict:
+    return {
+        "assemblyCode": electorate.assembly_code,
+        "ballotCode": ballot_code,
+        "electorateCode": electorate.code,
+        "electorateTitle": electorate.title,
+        "file": file_name,
+        "sha256": hashlib.sha256(content).hexdigest(),
+        "size": len(content),
+    }
+
+
+def _size(c: Combination) -> int:
+    return len(c.candidates) + len(c.results)
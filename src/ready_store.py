@@ -0,0 +1,262 @@
+import hashlib
+import json
+import mmap
+import struct
+import zlib
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any, Iterator, Optional, Sequence
+
+from src.helper.model_json import JsonRecord, ModelJson
+from src.model.combination import Combination
+
+
+class ReadyStore:
+    """Read single items from a ready json file, without loading the whole file.
+
+    The writer records the byte offset, length and CRC32 of each item
+    in an index file next to the ready file.
+    The index is binary, so it can be searched without reading all of it::
+
+        magic, version, header length, number of records
+        header: json with the ready file size and hash,
+                the first record and number of records of each type,
+                and the election codes
+        records: one fixed-size record for each item,
+                 sorted by type and then by code
+        strings: the codes, encoded as utf-8
+
+    Both files are memory-mapped.
+    An item is found by a binary search of the records of its type,
+    and only the requested items are decoded,
+    so memory use grows with the items that are read.
+    Each decoded item is checked against its CRC32,
+    and verify checks the hash of the whole ready file.
+    """
+
+    index_suffix = ".index"
+    index_version = 2
+
+    _magic = b"VPINDEX\0"
+    _prefix = struct.Struct("<8sIII")
+    # offset, length, crc32, code start, code length, election index
+    _record = struct.Struct("<QIIIII")
+    _no_election = 0xFFFFFFFF
+
+    def __init__(self, path: Path):
+        self._path = path
+        self._model_json = ModelJson()
+        self._header: Optional[dict] = None
+        # where the records and the codes start in the index file
+        self._records_start = 0
+        self._strings_start = 0
+        self._index_file = None
+        self._index_mmap: Optional[mmap.mmap] = None
+        self._file = None
+        self._mmap: Optional[mmap.mmap] = None
+
+    @classmethod
+    def index_path(cls, path: Path) -> Path:
+        """Get the index file for a ready file."""
+        return path.with_name(path.stem + cls.index_suffix)
+
+    @classmethod
+    def build_index(
+        cls, path: Path, record: JsonRecord, offsets: list[tuple[str, Any, int, int]]
+    ) -> bytes:
+        """Build the index for a ready file from the offsets recorded while writing.
+        The ready file is read to find the CRC32 of each item."""
+        content = path.read_bytes()
+        if len(content) != record.size:
+            raise ValueError(f"Ready file '{path}' does not match what was written.")
+
+        elections: dict[str, int] = {}
+        types: dict[str, list] = {name: [] for name in Combination.collection_names}
+        for name, item, offset, length in offsets:
+            election_code = Combination.partition_key("election_code", name, item)
+            if not election_code:
+                election = cls._no_election
+            else:
+                election = elections.setdefault(election_code, len(elections))
+            crc = zlib.crc32(content[offset : offset + length])
+            types[name].append(
+                (item.code.encode("utf-8"), offset, length, crc, election)
+            )
+
+        records = []
+        strings = bytearray()
+        positions = {}
+        for name, entries in types.items():
+            positions[name] = [len(records), len(entries)]
+            for code, offset, length, crc, election in sorted(entries):
+                records.append(
+                    cls._record.pack(
+                        offset, length, crc, len(strings), len(code), election
+                    )
+                )
+                strings += code
+
+        header = {
+            "file": path.name,
+            "size": record.size,
+            "sha256": record.sha256,
+            "types": positions,
+            "elections": list(elections),
+        }
+        header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+        return b"".join(
+            [
+                cls._prefix.pack(
+                    cls._magic, cls.index_version, len(header_bytes), len(records)
+                ),
+                header_bytes,
+                *records,
+                bytes(strings),
+            ]
+        )
+
+    def __enter__(self) -> "ReadyStore":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Release the memory maps."""
+        for name in ("_mmap", "_file", "_index_mmap", "_index_file"):
+            value = getattr(self, name)
+            if value is not None:
+                value.close()
+                setattr(self, name, None)
+
+    def types(self) -> list[str]:
+        """Get the names of the collections."""
+        return list(self._index_header()["types"].keys())
+
+    def codes(self, name: str) -> list[str]:
+        """Get the codes of the items in a collection, sorted by code."""
+        return [self._code(i).decode("utf-8") for i in self._range(name)]
+
+    def get(self, name: str, code: str) -> Optional[Any]:
+        """Get one item from a collection by its code."""
+        records = self._range(name)
+        wanted = code.encode("utf-8")
+        position = bisect_left(_Codes(self, records), wanted)
+        if position == len(records):
+            return None
+        index = records[position]
+        if self._code(index) != wanted:
+            return None
+        offset, length, crc, _, _, _ = self._unpack(index)
+        return self._decode(name, offset, length, crc)
+
+    def find(self, code: str) -> Optional[tuple[str, Any]]:
+        """Get the collection name and item for a code from any collection."""
+        for name in self.types():
+            item = self.get(name, code)
+            if item is not None:
+                return name, item
+        return None
+
+    def items(self, name: str, election_code: Optional[str] = None) -> Iterator[Any]:
+        """Get the items in a collection in the order of the ready file,
+        optionally only for one election."""
+        election = None
+        if election_code is not None:
+            elections = self._index_header()["elections"]
+            if election_code not in elections:
+                return
+            election = elections.index(election_code)
+
+        entries = [self._unpack(i) for i in self._range(name)]
+        for offset, length, crc, _, _, item_election in sorted(entries):
+            if election is None or item_election == election:
+                yield self._decode(name, offset, length, crc)
+
+    def election(self, election_code: str) -> Combination:
+        """Get all the items for one election."""
+        return Combination(
+            **{
+                name: list(self.items(name, election_code))
+                for name in Combination.collection_names
+            }
+        )
+
+    def verify(self) -> None:
+        """Check that the whole ready file has the hash in the index."""
+        digest = hashlib.sha256(self._map()).hexdigest()
+        if digest != self._index_header()["sha256"]:
+            raise ValueError(f"Index does not match ready file '{self._path}'.")
+
+    def _decode(self, name: str, offset: int, length: int, crc: int) -> Any:
+        content = self._map()[offset : offset + length]
+        if zlib.crc32(content) != crc:
+            raise ValueError(f"Index does not match ready file '{self._path}'.")
+        data = json.loads(content)
+        return self._model_json.from_dict(self._item_class(name), data)
+
+    def _item_class(self, name: str) -> type:
+        hint = Combination.__dataclass_fields__[name].type
+        (item_cls,) = hint.__args__
+        return item_cls
+
+    def _range(self, name: str) -> range:
+        first, count = self._index_header()["types"][name]
+        return range(first, first + count)
+
+    def _unpack(self, index: int) -> tuple[int, int, int, int, int, int]:
+        self._index_header()
+        start = self._records_start + index * self._record.size
+        return self._record.unpack_from(self._index_map(), start)
+
+    def _code(self, index: int) -> bytes:
+        _, _, _, code_start, code_length, _ = self._unpack(index)
+        start = self._strings_start + code_start
+        return self._index_map()[start : start + code_length]
+
+    def _map(self) -> mmap.mmap:
+        if self._mmap is None:
+            self._file = open(self._path, "rb")
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            if len(self._mmap) != self._index_header()["size"]:
+                self.close()
+                raise ValueError(f"Index does not match ready file '{self._path}'.")
+        return self._mmap
+
+    def _index_map(self) -> mmap.mmap:
+        if self._index_mmap is None:
+            self._index_file = open(self.index_path(self._path), "rb")
+            self._index_mmap = mmap.mmap(
+                self._index_file.fileno(), 0, access=mmap.ACCESS_READ
+            )
+        return self._index_mmap
+
+    def _index_header(self) -> dict:
+        if self._header is None:
+            index = self._index_map()
+            magic, version, length, count = self._prefix.unpack_from(index, 0)
+            if magic != self._magic:
+                raise ValueError(
+                    f"File '{self.index_path(self._path)}' is not an index."
+                )
+            if version != self.index_version:
+                raise ValueError(f"Unknown index version '{version}'.")
+            start = self._prefix.size
+            self._header = json.loads(index[start : start + length])
+            self._records_start = start + length
+            self._strings_start = self._records_start + count * self._record.size
+        return self._header
+
+
+class _Codes(Sequence):
+    """The codes of a range of index records, for a binary search."""
+
+    def __init__(self, store: ReadyStore, records: range):
+        self._store = store
+        self._records = records
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __getitem__(self, index: int) -> bytes:
+        return self._store._code(self._records[index])
@@ -1,43 +1,67 @@
+import codecs
 import csv
+import io
 import json
 import pkgutil
+import sys
 import zipfile
 from importlib import import_module
 from json import JSONDecodeError
 from pathlib import Path
-from typing import Union
+from typing import BinaryIO, Iterable, Iterator, Optional, Sequence, Union
 from xml.etree import ElementTree
 from xml.etree.ElementTree import Element
 
 from src.helper.general import General
+from src.helper.member_cache import MemberCache
+from src.helper.table import Table
+from src.helper.xml_node import XmlNode
+from src.helper.xml_stream import XmlStream
+from src.helper.zip_members import ZipMembers
 
 
 class Store:
     """Read data from various storage formats."""
 
-    def __init__(self, general: General):
+    default_table_min_bytes = 1024 * 1024
+
+    def __init__(
+        self,
+        general: General,
+        cache: Optional[MemberCache] = None,
+        table_min_bytes: int = default_table_min_bytes,
+    ):
         self._general = general
+        self._cache = cache
+        self._table_min_bytes = table_min_bytes
+
+        # cached members are parsed again when the parsing code changes
+        self._cache_variant = ""
+        if cache is not None:
+            source = cache.source_digest(
+                [sys.modules[__name__], sys.modules[Table.__module__]]
+            )
+            self._cache_variant = f"table-min-bytes-{table_min_bytes}|{source}"
+
+    @property
+    def cache(self) -> Optional[MemberCache]:
+        """The cache of parsed zip file members, if there is one."""
+        return self._cache
 
-    def read_xml_content(self, content: str) -> dict:
+    def read_xml_content(self, content: str) -> XmlNode:
         """Read the xml into a tree structure."""
         root = ElementTree.fromstring(content)
         return self.read_xml_et(root)
 
-    def read_xml_file(self, path: Path) -> dict:
+    def read_xml_file(self, path: Path) -> XmlNode:
         """Read a xml file."""
         tree = ElementTree.parse(path)
         root = tree.getroot()
         return self.read_xml_et(root)
 
-    def read_xml_et(self, element: Element) -> dict:
-        """convert a xml ElementTree into nested dicts."""
-        return {
-            "tag": element.tag,
-            "attributes": element.attrib,
-            "text": (element.text or "").strip(),
-            "tail": (element.tail or "").strip(),
-            "children": [self.read_xml_et(child) for child in element],
-        }
+    def read_xml_et(self, element: Element) -> XmlNode:
+        """Convert a xml ElementTree into a tree of compact nodes."""
+        return XmlNode.from_element(element)
 
     def read_json_content(self, content: str) -> Union[list, dict]:
         """Read the json."""
@@ -58,9 +82,12 @@ class Store:
 
     def read_csv_content(self, content: str) -> list[dict]:
         """Read the csv into rows."""
-        lines = content.splitlines()
-        lines = [line for line in lines if "," in line]
-        return [i for i in csv.DictReader(lines, dialect="excel")]
+        return list(self.iter_csv_lines(content.splitlines()))
+
+    def iter_csv_lines(self, lines: Iterable[str]) -> Iterator[dict]:
+        """Read csv lines into rows, skipping lines that have no separator."""
+        lines = (line for line in lines if "," in line)
+        return csv.DictReader(lines, dialect="excel")
 
     def read_csv_file(self, path: Path) -> list[dict]:
         """Read the csv file into rows."""
@@ -69,9 +96,12 @@ class Store:
 
     def read_tsv_content(self, content: str) -> list[dict]:
         """Read the tsv into rows."""
-        lines = content.splitlines()
-        lines = [line for line in lines if "\t" in line]
-        return [i for i in csv.DictReader(lines, dialect="excel-tab")]
+        return list(self.iter_tsv_lines(content.splitlines()))
+
+    def iter_tsv_lines(self, lines: Iterable[str]) -> Iterator[dict]:
+        """Read tsv lines into rows, skipping lines that have no separator."""
+        lines = (line for line in lines if "\t" in line)
+        return csv.DictReader(lines, dialect="excel-tab")
 
     def read_tsv_file(self, path: Path) -> list[dict]:
         """Read the tsv file into rows."""
@@ -89,33 +119,144 @@ class Store:
             return self.try_read_text(content_path)
 
     def read_zip_file_list(self, path: Path) -> dict:
-        """Read the files in a zip file."""
-        result = {}
-        filenames = self.get_zip_file_list(path)
-        for filename in filenames:
-            if filename.endswith(".csv"):
-                original_file_content = self.read_text_zip_file(path, filename)
-                result[filename] = self.read_csv_content(original_file_content)
+        """Read the files in a zip file.
+
+        The zip file is opened once, and each file is streamed
+        instead of being read into memory as text.
+        """
+        with self._general.report.stage("zip read"):
+            with zipfile.ZipFile(path, "r") as f:
+                return {
+                    info.filename: self.read_zip_member(f, info)
+                    for info in self.get_zip_info_list(f)
+                }
+
+    def read_zip_members(self, path: Path) -> ZipMembers:
+        """Provide the files in a zip file, reading each file when it is first used."""
+        return ZipMembers(path, self.get_zip_file_list(path), self.read_zip_member)
+
+    def read_zip_member(self, archive: zipfile.ZipFile, info: zipfile.ZipInfo):
+        """Read one file in an open zip file, using the cache if there is one."""
+        with self._general.report.stage("member read"):
+            if self._cache is None or info.filename.endswith(".xml"):
+                # xml files are not cached: they are streamed each time they are used,
+                # selecting only the needed elements, so a warm run still parses them
+                return self.parse_zip_member(archive, info)
+
+            return self._cache.get_or_read(
+                Path(archive.filename),
+                info,
+                lambda: self.parse_zip_member(archive, info),
+                variant=self._cache_variant,
+            )
+
+    def parse_zip_member(self, archive: zipfile.ZipFile, info: zipfile.ZipInfo):
+        """Read one file in an open zip file, based on the file extension."""
+        with self._general.report.stage("member parse"):
+            return self._parse_zip_member(archive, info)
+
+    def _parse_zip_member(self, archive: zipfile.ZipFile, info: zipfile.ZipInfo):
+        filename = info.filename
+        if filename.endswith(".csv") or filename.endswith(".tsv"):
+            return self.read_zip_rows(archive, info)
 
-            elif filename.endswith(".tsv"):
-                original_file_content = self.read_text_zip_file(path, filename)
-                result[filename] = self.read_tsv_content(original_file_content)
+        elif filename.endswith(".xml"):
+            return XmlStream.from_zip(Path(archive.filename), filename)
 
-            elif filename.endswith(".xml"):
-                original_file_content = self.read_text_zip_file(path, filename)
-                result[filename] = self.read_xml_content(original_file_content)
+        elif filename.endswith(".txt"):
+            with archive.open(info) as raw:
+                return self.read_text_stream(raw)
 
-            elif filename.endswith(".txt"):
-                result[filename] = self.read_text_zip_file(path, filename)
+        else:
+            return f"Unknown extension for file '{filename}'."
 
-            else:
-                result[filename] = f"Unknown extension for file '{filename}'."
-        return result
+    def read_zip_rows(
+        self, archive: zipfile.ZipFile, info: zipfile.ZipInfo
+    ) -> Sequence[dict]:
+        """Read the rows of a csv or tsv file in an open zip file.
+
+        Large files are stored as a Table, unless the rows do not all
+        have the same fields.
+        """
+        if info.file_size >= self._table_min_bytes:
+            try:
+                with archive.open(info) as raw:
+                    reader = self._iter_delimited(info.filename, raw)
+                    table = Table.from_rows(reader.fieldnames or [], reader)
+                    self._general.report.count("rows read", len(table))
+                    return table
+            except ValueError as e:
+                self._general.log.debug(f"Not read as a table: {e}")
+
+        with archive.open(info) as raw:
+            rows = list(self._iter_delimited(info.filename, raw))
+        self._general.report.count("rows read", len(rows))
+        return rows
+
+    def _iter_delimited(self, filename: str, raw: BinaryIO) -> csv.DictReader:
+        lines = self.iter_text_lines(raw)
+        if filename.endswith(".tsv"):
+            return self.iter_tsv_lines(lines)
+        return self.iter_csv_lines(lines)
+
+    def iter_zip_rows(self, path: Path, filename: str) -> Iterator[dict]:
+        """Yield the rows of a csv or tsv file in a zip file."""
+        count = 0
+        try:
+            with zipfile.ZipFile(path, "r") as f:
+                with f.open(filename) as raw:
+                    for row in self._iter_delimited(filename, raw):
+                        count += 1
+                        yield row
+        finally:
+            self._general.report.count("rows read", count)
+
+    def iter_text_lines(self, raw: BinaryIO) -> Iterator[str]:
+        """Decode a binary stream incrementally and yield the lines of text.
+
+        Line endings are removed, to match the result of str.splitlines.
+        """
+        if not hasattr(raw, "peek"):
+            raw = io.BufferedReader(raw)
+        encoding = self.sniff_encoding(raw.peek(4))
+        text = io.TextIOWrapper(raw, encoding=encoding, newline="")
+        try:
+            for line in text:
+                yield line.rstrip("\r\n")
+        finally:
+            # leave closing the binary stream to the caller
+            text.detach()
+
+    def read_text_stream(self, raw: BinaryIO) -> str:
+        """Decode all of a binary stream as text."""
+        if not hasattr(raw, "peek"):
+            raw = io.BufferedReader(raw)
+        encoding = self.sniff_encoding(raw.peek(4))
+        text = io.TextIOWrapper(raw, encoding=encoding)
+        try:
+            return text.read()
+        finally:
+            text.detach()
+
+    def sniff_encoding(self, start: bytes) -> str:
+        """Choose the text encoding from the byte order mark, if there is one."""
+        if start.startswith(codecs.BOM_UTF8):
+            return "utf-8-sig"
+        if start.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+            return "utf-16"
+        return "utf-8"
 
     def get_zip_file_list(self, path: Path) -> list[str]:
         """Get the filenames in a zip file."""
-        with zipfile.ZipFile(path, "r") as f:
-            return [i.name for i in zipfile.Path(f).iterdir() if i.is_file()]
+        with self._general.report.stage("zip read"):
+            with zipfile.ZipFile(path, "r") as f:
+                return [i.filename for i in self.get_zip_info_list(f)]
+
+    def get_zip_info_list(self, archive: zipfile.ZipFile) -> list[zipfile.ZipInfo]:
+        """Get the info for the files in the top level of an open zip file."""
+        return [
+            i for i in archive.infolist() if not i.is_dir() and "/" not in i.filename
+        ]
 
     def get_parser(self, parser_dir: Path, find_name: str):
         results = pkgutil.iter_modules(path=[str(parser_dir)], prefix="")
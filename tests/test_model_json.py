@@ -0,0 +1,159 @@
+import io
+from pathlib import Path
+
+import pytest
+
+from src.helper.model_json import ModelJson
+from src.model.combination import Combination
+
+
+def _notes(content):
+    return [
+        {"display": "division name", "content": content, "category": "raw-info"},
+        {"display": "missing", "content": None, "category": "raw-info"},
+    ]
+
+
+def _fixture() -> Combination:
+    """A small combination with every model, non-ascii text and empty values."""
+    return Combination.from_dict(
+        {
+            "assemblies": [
+                {
+                    "code": "2022-au-house",
+                    "title": "House of Representatives",
+                    "electionCode": "2022-au",
+                    "electorateCodes": ["2022-au-house-o-connor"],
+                    "ballotCodes": [],
+                    "notes": [],
+                }
+            ],
+            "ballots": [
+                {
+                    "code": "2022-au-house-o-connor-ballot",
+                    "category": "single",
+                    "groupCandidatesByParty": False,
+                    "orderMethod": "",
+                    "notes": _notes("O’Connor"),
+                    "electionCode": "2022-au",
+                    "assemblyCode": "2022-au-house",
+                    "electorateCode": "2022-au-house-o-connor",
+                    "partyCodes": ["2022-au-greens"],
+                    "candidateCodes": ["2022-au-house-o-connor-smith-zoë"],
+                    "resultCodes": [],
+                }
+            ],
+            "candidates": [
+                {
+                    "code": "2022-au-house-o-connor-smith-zoë",
+                    "title": "Zoë Smith",
+                    "nameFirst": "Zoë",
+                    "nameLast": "Smith",
+                    "notes": [],
+                    "electionCode": "2022-au",
+                    "assemblyCode": "2022-au-house",
+                    "electorateCode": "2022-au-house-o-connor",
+                    "partyCode": None,
+                    "ballotCode": "2022-au-house-o-connor-ballot",
+                    "resultCodes": ["2022-au-house-o-connor-enrolment"],
+                }
+            ],
+            "elections": [
+                {
+                    "code": "2022-au",
+                    "title": '2022 Federal "Election"',
+                    "locationCountry": "AU",
+                    "locationAdministrativeAreaName": "",
+                    "locationLocalityName": "",
+                    "locationDescription": "Line one\nLine two\ttabbed",
+                    "date": "2022-05-21",
+                    "dateTimeZone": "Australia/Sydney",
+                    "assemblyCodes": ["2022-au-house"],
+                    "partyCodes": ["2022-au-greens"],
+                    "notes": _notes("federal"),
+                }
+            ],
+            "electorates": [
+                {
+                    "code": "2022-au-house-o-connor",
+                    "title": "O’Connor",
+                    "ballotCodes": ["2022-au-house-o-connor-ballot"],
+                    "notes": [],
+                    "electionCode": "2022-au",
+                    "assemblyCode": "2022-au-house",
+                    "candidateCodes": [],
+                }
+            ],
+            "parties": [
+                {
+                    "code": "2022-au-greens",
+                    "shortName": "GRN",
+                    "title": "The Greens",
+                    "altTitles": ["Australian Greens", "Les Verts"],
+                    "category": "",
+                    "notes": [],
+                    "electionCode": "2022-au",
+                    "candidateCodes": ["2022-au-house-o-connor-smith-zoë"],
+                }
+            ],
+            "results": [
+                {
+                    "code": "2022-au-house-o-connor-enrolment",
+                    "title": "O’Connor Enrolment",
+                    "value": 123456789012,
+                    "category": "people_count",
+                    "ancestorCodes": [],
+                    "childCodes": ["2022-au-house-o-connor-population"],
+                    "notes": [],
+                    "electionCode": "2022-au",
+                    "assemblyCode": "2022-au-house",
+                    "electorateCode": "2022-au-house-o-connor",
+                    "ballotCode": None,
+                }
+            ],
+        }
+    )
+
+
+def _schema_bytes(c: Combination) -> bytes:
+    return Combination.schema().dumps(c, sort_keys=True).encode("utf-8")
+
+
+def _dump_bytes(c: Combination) -> bytes:
+    buffer = io.StringIO()
+    ModelJson().dump(c, buffer)
+    return buffer.getvalue().encode("utf-8")
+
+
+def test_dump_matches_schema():
+    c = _fixture()
+    assert _dump_bytes(c) == _schema_bytes(c)
+
+
+def test_dumps_matches_schema():
+    c = _fixture()
+    assert ModelJson().dumps(c).encode("utf-8") == _schema_bytes(c)
+
+
+def test_empty_matches_schema():
+    c = Combination.build_empty()
+    assert _dump_bytes(c) == _schema_bytes(c)
+
+
+def test_record_matches_bytes():
+    c = _fixture()
+    buffer = io.StringIO()
+    record = ModelJson().dump(c, buffer)
+    content = buffer.getvalue().encode("utf-8")
+    assert record.size == len(content)
+    assert record.counts["results"] == 1
+
+
+def test_ready_file_matches_schema():
+    path = Path(__file__).parent.parent / "ready" / "2020-10-31-au-qld.json"
+    if not path.exists():
+        pytest.skip(f"Ready file '{path.name}' does not exist.")
+    expected = path.read_bytes()
+    c = Combination.schema().loads(expected.decode("utf-8"))
+    assert _schema_bytes(c) == expected
+    assert _dump_bytes(c) == expected